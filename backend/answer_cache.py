@@ -0,0 +1,153 @@
+import json
+import time
+
+import numpy as np
+
+from embeddings.vector_store import published_timestamp
+
+
+# ===============================================================================
+# Semantic answer cache
+#
+# Answers to standalone questions are stored with the question's embedding.
+# A new question whose embedding is close enough to a cached one gets the
+# cached answer replayed instead of a full retrieve/grade/generate run.
+# Each entry's TTL follows the freshness of its sources: a fraction of the
+# newest source article's age, within [min_ttl_seconds, max_ttl_seconds], so
+# answers about a developing story expire quickly and answers about settled
+# ones last longer (ttl_seconds when no source has a date). All entries are
+# dropped when the vector index is re-ingested (the ingest script rewrites
+# the index version file), which covers updated source articles.
+
+class SemanticAnswerCache:
+    def __init__(self, threshold=0.95, ttl_seconds=21600, max_entries=500, version_file=None,
+                 min_ttl_seconds=900, max_ttl_seconds=86400, freshness_ratio=0.5):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.min_ttl_seconds = min_ttl_seconds
+        self.max_ttl_seconds = max_ttl_seconds
+        self.freshness_ratio = freshness_ratio
+        self.max_entries = max_entries
+        self.version_file = version_file
+        self._entries = []
+        self._matrix = None
+        self._index_version = self._read_index_version()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _read_index_version(self):
+        if not self.version_file:
+            return None
+        try:
+            with open(self.version_file, "r", encoding="utf-8") as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def _check_index_version(self):
+        """Drop everything if the index was re-ingested since the last check."""
+
+        version = self._read_index_version()
+        if version != self._index_version:
+            self._index_version = version
+            self.invalidate()
+
+    def _evict_expired(self):
+        now = time.time()
+        kept = [e for e in self._entries if e["expires_at"] > now]
+        if len(kept) != len(self._entries):
+            self._entries = kept
+            self._matrix = None
+
+    def _get_matrix(self):
+        if self._matrix is None and self._entries:
+            self._matrix = np.vstack([e["embedding"] for e in self._entries])
+        return self._matrix
+
+    def lookup(self, embedding):
+        """Return the closest cached entry above the similarity threshold, if any."""
+
+        self._check_index_version()
+        self._evict_expired()
+
+        matrix = self._get_matrix()
+        if matrix is None:
+            self.misses += 1
+            return None
+
+        scores = matrix @ _normalize(embedding)
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return {**self._entries[best], "similarity": float(scores[best])}
+
+    def entry_ttl(self, sources, now=None):
+        """Seconds to keep an answer, from the age of its newest source article."""
+
+        now = now or time.time()
+        stamps = [published_timestamp(source.get("publication_date")) for source in sources or []]
+        stamps = [ts for ts in stamps if ts is not None]
+        if not stamps:
+            return self.ttl_seconds
+        age = max(now - max(stamps), 0)
+        return min(max(age * self.freshness_ratio, self.min_ttl_seconds), self.max_ttl_seconds)
+
+    def store(self, question, embedding, answer, sources):
+        now = time.time()
+        self._entries.append({
+            "question": question,
+            "embedding": _normalize(embedding),
+            "answer": answer,
+            "sources": sources,
+            "expires_at": now + self.entry_ttl(sources, now),
+        })
+        if len(self._entries) > self.max_entries:
+            self._entries = self._entries[-self.max_entries:]
+        self._matrix = None
+
+    def invalidate(self):
+        self._entries = []
+        self._matrix = None
+        self.invalidations += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+def _normalize(embedding):
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+async def replay_answer_events(entry):
+    """Replay a cached answer as the answer events of a graph run (see graph.answer_events)."""
+
+    if entry.get("sources") is not None:
+        yield {"type": "sources", "sources": entry["sources"]}
+    yield {"type": "delta", "node": "generate_answer", "text": entry["answer"]}
+    yield {"type": "update", "node": "generate_answer", "messages": 1}
+
+
+def tool_output_sources(output):
+    """Retriever results from a tool output (raw list or ToolMessage)."""
+
+    content = getattr(output, "content", output)
+    if isinstance(content, str):
+        try:
+            content = json.loads(content)
+        except ValueError:
+            return []
+    return content if isinstance(content, list) else []
@@ -7,7 +7,9 @@ from fastapi.responses import FileResponse
 from .slices.chats.controller import router as chats_router
 from .slices.realtime.controller import router as realtime_router
 from .slices.auth.controller import router as auth_router
-from .slices.auth.service import ensure_firebase
+from .slices.metrics.controller import router as metrics_router
+from .slices.maintenance.controller import router as maintenance_router
+from .slices.auth.service import ensure_firebase, start_certificate_refresh, stop_certificate_refresh
 from ..graph import setup_checkpointer, shutdown_checkpointer
 
 
@@ -15,6 +17,7 @@ from ..graph import setup_checkpointer, shutdown_checkpointer
 async def lifespan(app: FastAPI):
     # Startup
     ensure_firebase()
+    start_certificate_refresh()
     
     try:
         await setup_checkpointer()
@@ -24,6 +27,7 @@ async def lifespan(app: FastAPI):
     yield
     
     # Shutdown
+    stop_certificate_refresh()
     try:
         await shutdown_checkpointer()
     except Exception:
@@ -48,6 +52,8 @@ def create_app() -> FastAPI:
     app.include_router(auth_router, prefix="")
     app.include_router(chats_router, prefix="")
     app.include_router(realtime_router, prefix="")
+    app.include_router(metrics_router, prefix="")
+    app.include_router(maintenance_router, prefix="")
 
     return app
 
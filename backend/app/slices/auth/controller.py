@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends
-from .schemas import SessionRequest, SessionResponse, ErrorResponse
-from .dependencies import get_current_user
-from .service import verify_id_token, get_user_info_from_token
+from fastapi import APIRouter, Depends, HTTPException, status
+from .schemas import SessionRequest, SessionResponse, ErrorResponse, RevokeResponse
+from .dependencies import get_current_user, ADMIN_USER_IDS
+from .service import verify_id_token, get_user_info_from_token, revoke_user_tokens
 
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -9,7 +9,7 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 
 @router.post("/session", response_model=SessionResponse, responses={401: {"model": ErrorResponse}})
 async def create_session(payload: SessionRequest) -> SessionResponse:
-    decoded = verify_id_token(payload.id_token)
+    decoded = await verify_id_token(payload.id_token)
     info = get_user_info_from_token(decoded)
     return SessionResponse(**info)
 
@@ -19,3 +19,11 @@ async def me(user = Depends(get_current_user)) -> SessionResponse:
     return SessionResponse(**user)
 
 
+@router.post("/revoke/{user_id}", response_model=RevokeResponse, responses={403: {"model": ErrorResponse}})
+async def revoke(user_id: str, user = Depends(get_current_user)) -> RevokeResponse:
+    """Sign the user out everywhere: their current ID tokens stop being accepted."""
+
+    if user_id != user.get("user_id") and user.get("user_id") not in ADMIN_USER_IDS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    dropped = await revoke_user_tokens(user_id)
+    return RevokeResponse(user_id=user_id, cached_tokens_dropped=dropped)
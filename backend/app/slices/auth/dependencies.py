@@ -1,3 +1,4 @@
+import os
 from typing import Dict, Any
 from fastapi import Header, HTTPException, status, Depends
 from .service import verify_id_token, get_user_info_from_token
@@ -13,7 +14,7 @@ async def get_current_user(authorization: str = Header(None)) -> Dict[str, Any]:
 
     token = parts[1]
     try:
-        decoded = verify_id_token(token)
+        decoded = await verify_id_token(token)
         user = get_user_info_from_token(decoded)
         if not user.get("user_id"):
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
@@ -24,3 +25,11 @@ async def get_current_user(authorization: str = Header(None)) -> Dict[str, Any]:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Auth failed: {exc}")
 
 
+# Comma-separated Firebase user ids allowed to call maintenance endpoints
+ADMIN_USER_IDS = {uid.strip() for uid in os.getenv("ADMIN_USER_IDS", "").split(",") if uid.strip()}
+
+
+async def require_admin(user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
+    if user.get("user_id") not in ADMIN_USER_IDS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    return user
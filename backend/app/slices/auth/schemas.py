@@ -12,6 +12,11 @@ class SessionResponse(BaseModel):
     display_name: Optional[str] = None
 
 
+class RevokeResponse(BaseModel):
+    user_id: str
+    cached_tokens_dropped: int = 0
+
+
 class ErrorResponse(BaseModel):
     error: str
 
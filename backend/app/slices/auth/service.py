@@ -1,11 +1,25 @@
 from typing import Optional, Dict, Any
+import asyncio
 import os
+import time
 
+import google.oauth2.id_token
 from firebase_admin import auth as fb_auth, credentials, initialize_app, get_app
 
+from .token_cache import VerifiedTokenCache, CertificateCache, TokenRevokedError, token_key
+
 
 _firebase_initialized = False
 
+# Verified claims by token hash, and Google's signing certificates kept in memory
+token_cache = VerifiedTokenCache(
+    max_entries=int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.getenv("AUTH_TOKEN_CACHE_TTL", "300")),
+)
+certificates = CertificateCache()
+_verifications: Dict[str, asyncio.Future] = {}
+_certificate_task = None
+
 
 def ensure_firebase() -> None:
     global _firebase_initialized
@@ -30,10 +44,96 @@ def ensure_firebase() -> None:
         raise RuntimeError(f"Failed to initialize Firebase Admin: {exc}")
 
 
-def verify_id_token(id_token: str) -> Dict[str, Any]:
+def _verify_token(id_token: str) -> Dict[str, Any]:
+    """Full Firebase ID-token check (signature, exp, aud, iss, sub). Blocking; run in a thread."""
+
     ensure_firebase()
-    decoded = fb_auth.verify_id_token(id_token)
-    return decoded
+    if os.getenv("FIREBASE_AUTH_EMULATOR_HOST"):
+        return fb_auth.verify_id_token(id_token, check_revoked=True)
+
+    project_id = get_app().project_id
+    try:
+        claims = google.oauth2.id_token.verify_firebase_token(id_token, certificates, audience=project_id)
+    except ValueError as exc:
+        if "Certificate for key id" not in str(exc):
+            raise
+        # Signed with a key newer than our copy of the certificates (or not Google's)
+        if not certificates.force_refresh():
+            raise
+        claims = google.oauth2.id_token.verify_firebase_token(id_token, certificates, audience=project_id)
+
+    subject = claims.get("sub")
+    if claims.get("iss") != f"https://securetoken.google.com/{project_id}":
+        raise ValueError("Firebase ID token has an incorrect \"iss\" (issuer) claim.")
+    if not isinstance(subject, str) or not subject or len(subject) > 128:
+        raise ValueError("Firebase ID token has an invalid \"sub\" (subject) claim.")
+    claims["uid"] = subject
+    if token_cache.needs_revocation_check(subject):
+        token_cache.set_valid_after(subject, _tokens_valid_after(subject))
+    return claims
+
+
+def _tokens_valid_after(uid: str) -> Optional[float]:
+    """Firebase's tokens_valid_after_timestamp for the user, in seconds (blocking)."""
+
+    try:
+        user = fb_auth.get_user(uid)
+    except fb_auth.UserNotFoundError:
+        raise TokenRevokedError("The user of this Firebase ID token no longer exists.")
+    if user.disabled:
+        raise TokenRevokedError("The user account has been disabled.")
+    valid_after = user.tokens_valid_after_timestamp
+    return valid_after / 1000 if valid_after else None
+
+
+async def _verify_and_cache(id_token: str) -> Dict[str, Any]:
+    started = time.perf_counter()
+    claims = await asyncio.to_thread(_verify_token, id_token)
+    token_cache.check_revoked(claims)
+    token_cache.put(id_token, claims, time.perf_counter() - started)
+    return claims
+
+
+async def verify_id_token(id_token: str) -> Dict[str, Any]:
+    """Verified claims of an ID token.
+
+    Cached tokens are answered from memory until their exp; others are verified
+    in a worker thread, once even if several requests carry the same token.
+    """
+
+    claims = token_cache.get(id_token)
+    if claims is not None:
+        return claims
+
+    key = token_key(id_token)
+    verification = _verifications.get(key)
+    if verification is None:
+        verification = asyncio.ensure_future(_verify_and_cache(id_token))
+        _verifications[key] = verification
+        verification.add_done_callback(lambda _: _verifications.pop(key, None))
+    # Shielded: a cancelled request does not cancel the check for the others
+    return await asyncio.shield(verification)
+
+
+async def revoke_user_tokens(uid: str) -> int:
+    """Revoke the user's refresh tokens in Firebase and reject their current ID tokens here."""
+
+    ensure_firebase()
+    await asyncio.to_thread(fb_auth.revoke_refresh_tokens, uid)
+    return token_cache.revoke(uid)
+
+
+def start_certificate_refresh() -> None:
+    global _certificate_task
+    if _certificate_task is None:
+        _certificate_task = asyncio.create_task(certificates.keep_fresh())
+
+
+def stop_certificate_refresh() -> None:
+    global _certificate_task
+    if _certificate_task is not None:
+        _certificate_task.cancel()
+        _certificate_task = None
 
 
 def get_user_info_from_token(decoded_token: Dict[str, Any]) -> Dict[str, Optional[str]]:
@@ -0,0 +1,205 @@
+import asyncio
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import google.auth.exceptions
+import google.auth.transport
+import google.auth.transport.requests
+
+
+# ===============================================================================
+# Verified ID-token cache and background-refreshed signing certificates
+#
+# A Firebase ID token is valid until its `exp` (one hour), and the app sees the
+# same token on every REST call and WebSocket connect. Its verified claims are
+# cached under the token's SHA-256, so only the first use pays for the RSA check.
+# Entries are kept for at most ttl_seconds, then the token is verified again.
+#
+# Revocation follows Firebase's tokens_valid_after_timestamp, like
+# firebase_admin's check_revoked: it is looked up when a user's token is
+# verified and re-read once it is older than ttl_seconds, so a token revoked
+# anywhere (another worker, the Firebase console) stops working within
+# ttl_seconds. Revoking through this process applies here immediately.
+#
+# Google's public certificates are fetched by a background task (ahead of their
+# Cache-Control expiry) and served from memory to google-auth, so verification
+# never waits on the network.
+
+FIREBASE_CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+REFRESH_MARGIN_SECONDS = 300
+RETRY_SECONDS = 60
+FORCED_REFRESH_SECONDS = 60
+
+
+class TokenRevokedError(ValueError):
+    pass
+
+
+def token_key(id_token: str) -> str:
+    return hashlib.sha256(id_token.encode("utf-8")).hexdigest()
+
+
+class VerifiedTokenCache:
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # token hash -> (claims, expires_at); uid -> (valid_after or None, checked_at)
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._valid_after: Dict[str, Tuple[Optional[float], float]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.verifications = 0
+        self.verify_seconds = 0.0
+        self.revocation_lookups = 0
+
+    def get(self, id_token: str) -> Optional[Dict[str, Any]]:
+        key = token_key(id_token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= time.time():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        self.check_revoked(entry[0])
+        return entry[0]
+
+    def put(self, id_token: str, claims: Dict[str, Any], verify_seconds: float = 0.0) -> None:
+        expires_at = min(claims.get("exp", 0), time.time() + self.ttl_seconds)
+        with self._lock:
+            self.verifications += 1
+            self.verify_seconds += verify_seconds
+            self._entries[token_key(id_token)] = (claims, expires_at)
+            self._entries.move_to_end(token_key(id_token))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def needs_revocation_check(self, uid: str) -> bool:
+        """True if the user's valid-after time was never read or is older than ttl_seconds."""
+
+        record = self._valid_after.get(uid)
+        return record is None or record[1] + self.ttl_seconds <= time.time()
+
+    def set_valid_after(self, uid: str, valid_after: Optional[float]) -> None:
+        """Record the valid-after time read from Firebase (None: never revoked)."""
+
+        with self._lock:
+            self.revocation_lookups += 1
+            current = self._valid_after.get(uid, (None, 0.0))[0]
+            if current is not None and (valid_after is None or current > valid_after):
+                valid_after = current  # a revocation made here that Firebase has not reported yet
+            self._valid_after[uid] = (valid_after, time.time())
+
+    def check_revoked(self, claims: Dict[str, Any]) -> None:
+        valid_after = self._valid_after.get(claims.get("uid"), (None, 0.0))[0]
+        if valid_after is not None and claims.get("auth_time", claims.get("iat", 0)) < valid_after:
+            raise TokenRevokedError("The Firebase ID token has been revoked.")
+
+    def revoke(self, uid: str, valid_after: Optional[float] = None) -> int:
+        """Reject the user's tokens issued before valid_after (default: now); returns entries dropped."""
+
+        with self._lock:
+            # Whole seconds, as auth_time is; a sign-in in the same second stays valid
+            self._valid_after[uid] = (int(valid_after if valid_after is not None else time.time()), time.time())
+            stale = [key for key, (claims, _) in self._entries.items() if claims.get("uid") == uid]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "verifications": self.verifications,
+            "avg_verify_ms": self.verify_seconds * 1000 / self.verifications if self.verifications else 0.0,
+            "revoked_users": sum(1 for valid_after, _ in self._valid_after.values() if valid_after is not None),
+            "revocation_lookups": self.revocation_lookups,
+        }
+
+
+class _CachedResponse(google.auth.transport.Response):
+    def __init__(self, status, headers, data):
+        self._status, self._headers, self._data = status, headers, data
+
+    @property
+    def status(self):
+        return self._status
+
+    @property
+    def headers(self):
+        return self._headers
+
+    @property
+    def data(self):
+        return self._data
+
+
+class CertificateCache(google.auth.transport.Request):
+    """google-auth transport that answers the certificate URL from memory.
+
+    Other URLs, and the certificate URL before the first refresh or once the
+    copy has expired, go to the network (from the verification thread).
+    """
+
+    def __init__(self, certs_url: str = FIREBASE_CERTS_URL):
+        self.certs_url = certs_url
+        self._delegate = google.auth.transport.requests.Request()
+        self._response: Optional[_CachedResponse] = None
+        self.expires_at = 0.0
+        self.fetches = 0
+        self._forced_at = 0.0
+        self._forced_lock = threading.Lock()
+
+    def __call__(self, url, method="GET", body=None, headers=None, timeout=None, **kwargs):
+        if url == self.certs_url and method == "GET":
+            if self._response is None or time.time() >= self.expires_at:
+                self.refresh()
+            return self._response
+        return self._delegate(url, method=method, body=body, headers=headers, timeout=timeout, **kwargs)
+
+    def refresh(self) -> None:
+        response = self._delegate(self.certs_url, method="GET", timeout=10)
+        if response.status != 200:
+            raise google.auth.exceptions.TransportError(f"Could not fetch certificates at {self.certs_url}")
+        match = re.search(r"max-age=(\d+)", response.headers.get("cache-control", ""))
+        self._response = _CachedResponse(response.status, dict(response.headers), response.data)
+        self.expires_at = time.time() + (int(match.group(1)) if match else 3600)
+        self.fetches += 1
+
+    def force_refresh(self) -> bool:
+        """Refresh for an unknown key id, at most once per FORCED_REFRESH_SECONDS.
+
+        Returns False, without fetching, if a forced refresh ran too recently;
+        tokens with made-up key ids cannot make every request hit Google.
+        """
+
+        with self._forced_lock:
+            now = time.time()
+            if now - self._forced_at < FORCED_REFRESH_SECONDS:
+                return False
+            self._forced_at = now
+        self.refresh()
+        return True
+
+    async def keep_fresh(self) -> None:
+        """Refresh ahead of expiry forever (run as a background task)."""
+
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh)
+                delay = max(self.expires_at - time.time() - REFRESH_MARGIN_SECONDS, RETRY_SECONDS)
+            except Exception as exc:
+                print(f"Fetching Firebase certificates failed: {exc}")
+                delay = RETRY_SECONDS
+            await asyncio.sleep(delay)
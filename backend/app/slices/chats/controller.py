@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from .schemas import ChatsResponse, ChatHistoryResponse, ChatSummary, Message
 from .service import list_user_chats, get_thread_history
 from ..auth.dependencies import get_current_user
@@ -8,11 +8,16 @@ router = APIRouter()
 
 
 @router.get("/chats/{user_id}", response_model=ChatsResponse)
-async def get_all_chats(user_id: str, user = Depends(get_current_user)) -> ChatsResponse:
+async def get_all_chats(
+    user_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    user = Depends(get_current_user),
+) -> ChatsResponse:
     if not user_id or not user.get("user_id") or not user_id == user["user_id"]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
     try:
-        chats = await list_user_chats(user_id)
+        chats = await list_user_chats(user_id, limit=limit, offset=offset)
         summaries = [ChatSummary(**c) for c in chats]
         return ChatsResponse(chats=summaries)
     except Exception as exc:
@@ -1,10 +1,14 @@
 from pydantic import BaseModel
 from typing import List, Optional
+from datetime import datetime
 
 
 class ChatSummary(BaseModel):
     thread_id: str
     title: str
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    message_count: int = 0
 
 
 class ChatsResponse(BaseModel):
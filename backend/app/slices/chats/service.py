@@ -2,8 +2,9 @@ from typing import List, Dict, Any
 from backend.graph import get_all_thread_ids, get_full_conversation
 
 
-async def list_user_chats(user_id: str) -> List[Dict[str, Any]]:
-    chats = await get_all_thread_ids(user_id)
+async def list_user_chats(user_id: str, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+    # Index returns latest first; the sidebar prepends, so hand it oldest first
+    chats = await get_all_thread_ids(user_id, limit=limit, offset=offset)
     return chats[::-1]
 
 
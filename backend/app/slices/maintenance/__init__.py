@@ -0,0 +1,3 @@
+"""Maintenance vertical slice package."""
+
+
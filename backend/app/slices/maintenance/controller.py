@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, Query
+from .schemas import PruneReport, PruneResponse
+from .service import prune_checkpoints
+from ..auth.dependencies import require_admin
+
+
+router = APIRouter(prefix="/maintenance", tags=["maintenance"])
+
+
+@router.post("/checkpoints/prune", response_model=PruneResponse)
+async def prune_checkpoint_history(
+    keep: int = Query(1, ge=1, le=100),
+    dry_run: bool = Query(True),
+    user = Depends(require_admin),
+) -> PruneResponse:
+    try:
+        report = await prune_checkpoints(keep=keep, dry_run=dry_run)
+        return PruneResponse(report=PruneReport(**report))
+    except Exception as exc:
+        return PruneResponse(error=str(exc))
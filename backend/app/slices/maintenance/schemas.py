@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import Dict, Optional
+
+
+class PruneReport(BaseModel):
+    dry_run: bool = True
+    keep: int = 1
+    threads_pruned: int = 0
+    rows_deleted: Dict[str, int] = {}
+    bytes_deleted: Dict[str, int] = {}
+    table_bytes_before: Dict[str, int] = {}
+    table_bytes_after: Dict[str, int] = {}
+    seconds: float = 0.0
+
+
+class PruneResponse(BaseModel):
+    report: Optional[PruneReport] = None
+    error: Optional[str] = None
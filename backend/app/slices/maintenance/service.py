@@ -0,0 +1,6 @@
+from typing import Dict, Any
+from ....graph import prune_checkpoint_history
+
+
+async def prune_checkpoints(keep: int, dry_run: bool) -> Dict[str, Any]:
+    return await prune_checkpoint_history(keep=keep, dry_run=dry_run)
@@ -0,0 +1,3 @@
+"""Metrics vertical slice package."""
+
+
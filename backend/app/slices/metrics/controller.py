@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends
+from .schemas import PoolStatsResponse, PoolStats, EmbeddingCacheStats, AnswerCacheStats, AuthTokenCacheStats, NodeUsageResponse
+from .service import db_pool_stats, embedding_cache_stats, answer_cache_stats, auth_token_cache_stats, node_usage_stats
+from ..auth.dependencies import require_admin
+
+
+# Pool internals and per-node timings are for operators only
+router = APIRouter(prefix="/metrics", tags=["metrics"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/db-pool", response_model=PoolStatsResponse)
+async def get_db_pool_stats() -> PoolStatsResponse:
+    stats = db_pool_stats()
+    if stats is None:
+        return PoolStatsResponse(error="Database pool is not initialized")
+    return PoolStatsResponse(pool=PoolStats(**stats))
+
+
+@router.get("/embedding-cache", response_model=EmbeddingCacheStats)
+async def get_embedding_cache_stats() -> EmbeddingCacheStats:
+    return EmbeddingCacheStats(**embedding_cache_stats())
+
+
+@router.get("/answer-cache", response_model=AnswerCacheStats)
+async def get_answer_cache_stats() -> AnswerCacheStats:
+    return AnswerCacheStats(**answer_cache_stats())
+
+
+@router.get("/auth-cache", response_model=AuthTokenCacheStats)
+async def get_auth_cache_stats() -> AuthTokenCacheStats:
+    return AuthTokenCacheStats(**auth_token_cache_stats())
+
+
+@router.get("/nodes", response_model=NodeUsageResponse)
+async def get_node_usage() -> NodeUsageResponse:
+    return NodeUsageResponse(**node_usage_stats())
@@ -0,0 +1,73 @@
+from pydantic import BaseModel
+from typing import Dict, Optional
+
+
+class PoolStats(BaseModel):
+    pool_min: int = 0
+    pool_max: int = 0
+    pool_size: int = 0
+    pool_available: int = 0
+    connections_in_use: int = 0
+    requests_waiting: int = 0
+    requests_num: int = 0
+    requests_queued: int = 0
+    requests_wait_ms: int = 0
+    requests_errors: int = 0
+    connections_lost: int = 0
+    avg_wait_ms: float = 0.0
+    utilisation: float = 0.0
+
+
+class PoolStatsResponse(BaseModel):
+    pool: Optional[PoolStats] = None
+    error: Optional[str] = None
+
+
+class AnswerCacheStats(BaseModel):
+    entries: int = 0
+    hits: int = 0
+    misses: int = 0
+    hit_rate: float = 0.0
+    invalidations: int = 0
+
+
+class EmbeddingCacheStats(BaseModel):
+    memory_entries: int = 0
+    memory_hits: int = 0
+    persistent_hits: int = 0
+    persistent_evictions: int = 0
+    misses: int = 0
+    hit_rate: float = 0.0
+    embedding_calls_saved: int = 0
+    avg_miss_latency_ms: float = 0.0
+    estimated_latency_saved_ms: float = 0.0
+
+
+class AuthTokenCacheStats(BaseModel):
+    entries: int = 0
+    hits: int = 0
+    misses: int = 0
+    hit_rate: float = 0.0
+    verifications: int = 0
+    avg_verify_ms: float = 0.0
+    revoked_users: int = 0
+    revocation_lookups: int = 0
+
+
+class NodeUsage(BaseModel):
+    runs: int = 0
+    avg_ms: float = 0.0
+    max_ms: float = 0.0
+    total_ms: float = 0.0
+    model_calls: int = 0
+    model_ms: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+    counters: Dict[str, int] = {}
+
+
+class NodeUsageResponse(BaseModel):
+    models: Dict[str, str] = {}
+    grader_mode: str = "llm"
+    nodes: Dict[str, NodeUsage] = {}
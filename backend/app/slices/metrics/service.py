@@ -0,0 +1,23 @@
+from typing import Optional, Dict, Any
+from ....graph import get_pool_stats, embedding_cache, answer_cache, model_router, usage_tracker, GRADER_MODE
+from ..auth.service import token_cache
+
+
+def db_pool_stats() -> Optional[Dict[str, Any]]:
+    return get_pool_stats()
+
+
+def embedding_cache_stats() -> Dict[str, Any]:
+    return embedding_cache.stats()
+
+
+def answer_cache_stats() -> Dict[str, Any]:
+    return answer_cache.stats()
+
+
+def auth_token_cache_stats() -> Dict[str, Any]:
+    return token_cache.stats()
+
+
+def node_usage_stats() -> Dict[str, Any]:
+    return {"models": model_router.models, "grader_mode": GRADER_MODE, "nodes": usage_tracker.stats()}
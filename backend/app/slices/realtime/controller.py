@@ -1,5 +1,9 @@
-from fastapi import APIRouter, WebSocket
-from .service import stream_chat
+import asyncio
+import contextlib
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from starlette.websockets import WebSocketState
+from .service import stream_chat, settle_cancelled_chat, parse_client_frame
 from ..auth.dependencies import get_current_user
 from ..auth.service import verify_id_token
 
@@ -27,7 +31,7 @@ async def websocket_endpoint(websocket: WebSocket, thread_id: str, user_id: str)
             await websocket.close(code=4401)
             return
         try:
-            decoded = verify_id_token(token)
+            decoded = await verify_id_token(token)
             uid = decoded.get("uid") or decoded.get("user_id")
             if not uid or not user_id == uid:
                 await websocket.close(code=4403)
@@ -36,19 +40,57 @@ async def websocket_endpoint(websocket: WebSocket, thread_id: str, user_id: str)
             await websocket.close(code=4401)
             return
 
-        while True:
-            data = await websocket.receive_text()
-            query = data
+        generation = None
+
+        async def generate(query: str):
+            """One turn; always ends with exactly one "done" or "error" frame."""
+
+            client_gone = False
             try:
                 print("Realtime chat started with thread_id ----> ", thread_id)
-                async for event in stream_chat(query, thread_id, 128000):
-                    if event["event"] == "on_chat_model_stream":
-                        token = event["data"]["chunk"].content
-                        if token:
-                            await websocket.send_text(token)
+                # aclosing: however the loop is left (cancel, failed send), the
+                # graph run and its model HTTP stream are unwound before settling
+                async with contextlib.aclosing(stream_chat(query, thread_id, 128000, user_id=user_id)) as frames:
+                    async for frame in frames:
+                        try:
+                            await websocket.send_json(frame)
+                        except Exception:
+                            client_gone = True
+                            break
+                if client_gone:
+                    await settle_cancelled_chat(thread_id, user_id)
+                    return
+                final = {"type": "done"}
+            except asyncio.CancelledError:
+                await settle_cancelled_chat(thread_id, user_id)
+                final = {"type": "done", "cancelled": True}
             except Exception as exc:
-                await websocket.send_text(f"Error: {str(exc)}")
-    finally:
-        await websocket.close()
+                final = {"type": "error", "message": str(exc)}
+            with contextlib.suppress(Exception):  # the client may be gone
+                await websocket.send_json(final)
 
+        async def cancel_generation():
+            if generation is None or generation.done():
+                return
+            generation.cancel()
+            await asyncio.wait({generation})
+            if generation.cancelled():
+                # Cancelled before it started: nothing ran, only its final frame is owed
+                with contextlib.suppress(Exception):
+                    await websocket.send_json({"type": "done", "cancelled": True})
 
+        # Receiving runs alongside generation, so a "cancel" frame, a new
+        # message or a disconnect stops the answer that is being generated
+        try:
+            while True:
+                kind, query = parse_client_frame(await websocket.receive_text())
+                await cancel_generation()
+                if kind == "message":
+                    generation = asyncio.create_task(generate(query))
+        except WebSocketDisconnect:
+            pass
+        finally:
+            await cancel_generation()
+    finally:
+        if websocket.client_state == WebSocketState.CONNECTED:
+            await websocket.close()
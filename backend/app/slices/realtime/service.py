@@ -1,12 +1,45 @@
-from typing import AsyncIterator, Dict, Any
-from ....graph import run_workflow
+import contextlib
+import json
+from typing import AsyncIterator, Dict, Any, Optional, Tuple
+from ....graph import run_workflow, settle_cancelled_turn
+from ....stream_coalescer import coalesce_deltas
 
 
-async def stream_chat(query: str, thread_id: str, max_tokens: int) -> AsyncIterator[Dict[str, Any]]:
-    stream = await run_workflow(query, thread_id, max_tokens)
+async def stream_chat(query: str, thread_id: str, max_tokens: int, user_id: str = None) -> AsyncIterator[Dict[str, Any]]:
+    """Frames for one chat turn: coalesced "delta" frames and "sources".
+
+    Closing the frames closes the graph run and waits for it to unwind.
+    """
+
+    stream = await run_workflow(query, thread_id, max_tokens, user_id=user_id)
     if stream is None:
         return
-    async for event in stream:
-        yield event
+    async with contextlib.aclosing(coalesce_deltas(stream)) as events:
+        async for event in events:
+            if event["type"] == "delta":
+                yield {"type": "delta", "text": event["text"]}
+            elif event["type"] == "sources":
+                yield {"type": "sources", "sources": event["sources"]}
+
+
+async def settle_cancelled_chat(thread_id: str, user_id: str = None) -> None:
+    try:
+        await settle_cancelled_turn(thread_id, user_id)
+    except Exception as exc:
+        print(f"Could not settle cancelled turn for thread {thread_id}: {exc}")
+
 
+def parse_client_frame(data: str) -> Tuple[str, Optional[str]]:
+    """("message", text) or ("cancel", None). Plain text is a message."""
 
+    try:
+        frame = json.loads(data)
+    except ValueError:
+        return "message", data
+    if not isinstance(frame, dict):
+        return "message", data
+    if frame.get("type") == "cancel":
+        return "cancel", None
+    if frame.get("type") == "message" and frame.get("text"):
+        return "message", frame["text"]
+    return "message", data
@@ -0,0 +1,96 @@
+"""Concurrency check: N parallel chats should finish in roughly the time of one.
+
+The OpenAI and Pinecone clients are replaced by fakes with fixed latency
+(the Pinecone fake blocks its thread like the real sync client), and the
+real workflow is compiled without a checkpointer. That chats stay in their
+own threads is checked by tests/test_concurrent_chats.py; this script only
+measures the speedup.
+
+Run from the backend folder:
+    python benchmarks/bench_concurrent_chats.py --chats 20
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from langchain_core.messages import AIMessage  # noqa: E402
+
+import graph  # noqa: E402
+
+LLM_LATENCY = 0.2
+EMBEDDING_LATENCY = 0.1
+VECTOR_QUERY_LATENCY = 0.1
+
+
+class FakeChatModel:
+    """Chat model stand-in: with tools bound it asks for retrieval, otherwise it answers."""
+
+    def __init__(self, reply, calls_tool=False):
+        self.reply = reply
+        self.calls_tool = calls_tool
+
+    def bind_tools(self, tools):
+        return FakeChatModel(self.reply, calls_tool=True)
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(LLM_LATENCY)
+        last = messages[-1]
+        last_type = last.get("role") if isinstance(last, dict) else last.type
+        if self.calls_tool and last_type in ("user", "human"):
+            return AIMessage(content="", tool_calls=[
+                {"name": "retriever_tool", "args": {"query": "news"}, "id": "call_1"}
+            ])
+        return AIMessage(content=self.reply)
+
+
+class FakeEmbeddings:
+    async def create(self, model, input):
+        await asyncio.sleep(EMBEDDING_LATENCY)
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[0.0] * 1536)])
+
+
+class FakeIndex:
+    def query(self, vector, top_k, include_metadata, **kwargs):
+        time.sleep(VECTOR_QUERY_LATENCY)
+        return {"matches": [
+            {"id": str(i), "score": 0.9, "metadata": {"url": f"https://www.reuters.com/world/{i}", "text": "text"}}
+            for i in range(top_k)
+        ]}
+
+
+async def run_chats(app, n):
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        app.ainvoke({"messages": [{"role": "user", "content": f"question {i}"}]})
+        for i in range(n)
+    ])
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=20)
+    args = parser.parse_args()
+
+    graph.client = SimpleNamespace(embeddings=FakeEmbeddings())
+    graph.index = FakeIndex()
+    graph.response_model = FakeChatModel(reply="Answer. Source: https://www.reuters.com/world/")
+    graph.grader_model = FakeChatModel(reply="yes")
+
+    app = graph.workflow.compile()
+
+    single = await run_chats(app, 1)
+    parallel = await run_chats(app, args.chats)
+
+    print(f"1 chat:          {single:.3f} s")
+    print(f"{args.chats} parallel chats: {parallel:.3f} s ({parallel / single:.2f}x of one chat)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,107 @@
+"""Ingestion throughput: serial embed/upsert loop vs. the concurrent pipeline.
+
+The embedding API is a local fake (httpx mock transport) with fixed latency and
+an occasional 429 carrying Retry-After; the vector store upsert sleeps.
+
+Run from the backend folder:
+    python benchmarks/bench_ingest.py --chunks 2000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+import httpx
+from openai import AsyncOpenAI
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "embeddings"))
+
+from pipeline import IngestStats, embed_with_retry, run_pipeline  # noqa: E402
+
+DIM = 8
+
+
+def fake_embedding_service(latency, rate_limit_every):
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(latency)
+        if rate_limit_every and calls % rate_limit_every == 0:
+            return httpx.Response(429, headers={"retry-after": "0.05"},
+                                  json={"error": {"message": "rate limited", "type": "rate_limit"}})
+        texts = httpx.Response(200, content=request.content).json()["input"]
+        return httpx.Response(200, json={
+            "object": "list",
+            "model": "fake",
+            "data": [{"object": "embedding", "index": i, "embedding": [random.random()] * DIM}
+                     for i in range(len(texts))],
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        })
+
+    return handler
+
+
+def make_client(args):
+    transport = httpx.MockTransport(fake_embedding_service(args.embed_latency, args.rate_limit_every))
+    return AsyncOpenAI(api_key="test", max_retries=0, http_client=httpx.AsyncClient(transport=transport))
+
+
+def make_chunks(n):
+    for i in range(n):
+        yield {"id": str(i), "text": f"chunk {i}", "metadata": {"url": f"https://example.com/{i}"}}
+
+
+async def serial(args):
+    """The previous loop: embed a batch, upsert it, then start the next one."""
+
+    client = make_client(args)
+    stats = IngestStats()
+    chunks = list(make_chunks(args.chunks))
+    for i in range(0, len(chunks), args.batch_size):
+        batch = chunks[i:i + args.batch_size]
+        await embed_with_retry(client, "fake", [c["text"] for c in batch], stats, base_delay=0.05)
+        time.sleep(args.upsert_latency)
+        stats.chunks += len(batch)
+        stats.batches += 1
+    stats.finished = time.perf_counter()
+    return stats
+
+
+async def pipelined(args):
+    client = make_client(args)
+    stats = IngestStats()
+    await run_pipeline(
+        make_chunks(args.chunks),
+        lambda texts: embed_with_retry(client, "fake", texts, stats, base_delay=0.05),
+        lambda vectors: time.sleep(args.upsert_latency),
+        batch_size=args.batch_size,
+        max_in_flight=args.max_in_flight,
+        stats=stats,
+    )
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    parser.add_argument("--embed-latency", type=float, default=0.2)
+    parser.add_argument("--upsert-latency", type=float, default=0.05)
+    parser.add_argument("--rate-limit-every", type=int, default=7)
+    args = parser.parse_args()
+
+    before = asyncio.run(serial(args))
+    after = asyncio.run(pipelined(args))
+    print(f"serial:    {before}")
+    print(f"pipelined: {after}")
+    print(f"speedup: {after.throughput / before.throughput:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
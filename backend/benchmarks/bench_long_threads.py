@@ -0,0 +1,92 @@
+"""Per-turn cost as a thread grows: resubmitting the whole history vs. only the new message.
+
+"full" reproduces the old run_workflow (read the thread, send every message
+back in); "delta" sends only the new message and trims inside the graph.
+Models and retrieval are instant fakes, so the numbers are graph/checkpoint
+overhead. Bytes are what the checkpointer serialises per turn.
+
+Run from the backend folder:
+    python benchmarks/bench_long_threads.py --turns 60
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from langgraph.checkpoint.memory import InMemorySaver  # noqa: E402
+
+import bench_concurrent_chats  # noqa: E402
+import graph  # noqa: E402
+from bench_concurrent_chats import FakeChatModel, FakeEmbeddings, FakeIndex  # noqa: E402
+
+ANSWER = "A long answer with sources. " * 40
+
+
+class MeasuringSaver(InMemorySaver):
+    """In-memory checkpointer that counts serialised bytes."""
+
+    def __init__(self):
+        super().__init__()
+        self.bytes_written = 0
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        values = checkpoint["channel_values"]
+        self.bytes_written += sum(len(self.serde.dumps_typed(values[k])[1]) for k in new_versions if k in values)
+        return await super().aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        self.bytes_written += sum(len(self.serde.dumps_typed(value)[1]) for _, value in writes)
+        return await super().aput_writes(config, writes, task_id, task_path)
+
+
+async def run_thread(mode, turns, samples):
+    saver = MeasuringSaver()
+    app = graph.workflow.compile(checkpointer=saver)
+    config = {"configurable": {"thread_id": mode, "max_tokens": 128000}}
+    results = {}
+
+    for turn in range(1, turns + 1):
+        new_message = {"role": "user", "content": f"question {turn}"}
+        before = saver.bytes_written
+        start = time.perf_counter()
+        if mode == "full":
+            state = await app.aget_state(config)
+            messages = list(state.values.get("messages", [])) or [graph.sys_msg]
+            payload = {"messages": messages + [new_message]}
+        else:
+            payload = {"messages": [new_message]}
+        async for _ in app.astream_events(payload, config, version="v1"):
+            pass
+        if turn in samples:
+            results[turn] = ((time.perf_counter() - start) * 1000, saver.bytes_written - before)
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=60)
+    args = parser.parse_args()
+
+    # Instant fakes: what is left is the per-turn graph and checkpoint work
+    bench_concurrent_chats.LLM_LATENCY = 0
+    bench_concurrent_chats.EMBEDDING_LATENCY = 0
+    bench_concurrent_chats.VECTOR_QUERY_LATENCY = 0
+    graph.client = SimpleNamespace(embeddings=FakeEmbeddings())
+    graph.index = FakeIndex()
+    graph.response_model = FakeChatModel(reply=ANSWER)
+    graph.grader_model = FakeChatModel(reply="yes")
+
+    samples = {1, args.turns // 2, args.turns}
+    for mode in ("full", "delta"):
+        results = await run_thread(mode, args.turns, samples)
+        line = "  ".join(f"turn {t}: {ms:6.1f} ms {size / 1024:7.1f} KiB" for t, (ms, size) in sorted(results.items()))
+        print(f"{mode:5s} {line}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,158 @@
+"""WebSocket streaming: one frame per token (astream_events) vs. answer events + coalescing.
+
+A local fake chat model streams tokens at a fixed interval; the WebSocket is a
+fake that records when each frame is sent. Latency is measured per token, from
+the moment the model emits it to the send of the frame that carries it.
+
+Run from the backend folder:
+    python benchmarks/bench_stream.py --chats 20 --tokens 500
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+from typing import Any
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from langchain_core.language_models import BaseChatModel  # noqa: E402
+from langchain_core.messages import AIMessage, AIMessageChunk  # noqa: E402
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult  # noqa: E402
+
+import bench_concurrent_chats  # noqa: E402
+import graph  # noqa: E402
+from bench_concurrent_chats import FakeChatModel, FakeEmbeddings, FakeIndex  # noqa: E402
+from stream_coalescer import coalesce_deltas  # noqa: E402
+
+emitted_at = {}
+token_ids = itertools.count()
+
+
+class FakeStreamingModel(BaseChatModel):
+    """Streams `tokens` numbered words, one every `interval` seconds; asks for retrieval first."""
+
+    tokens: int = 500
+    interval: float = 0.002
+    calls_tool: bool = False
+
+    @property
+    def _llm_type(self):
+        return "fake-streaming"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={"calls_tool": True})
+
+    def _wants_tool(self, messages):
+        return self.calls_tool and messages[-1].type == "human"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        raise NotImplementedError
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        chunks = [chunk.message async for chunk in self._astream(messages, stop, run_manager)]
+        message = sum(chunks[1:], chunks[0])
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(**message.model_dump(exclude={"type"})))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        if self._wants_tool(messages):
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": "retriever_tool", "args": json.dumps({"query": "news"}), "id": "call_1", "index": 0}
+            ]))
+            return
+        for _ in range(self.tokens):
+            await asyncio.sleep(self.interval)
+            token = f"w{next(token_ids)} "
+            emitted_at[token.strip()] = time.perf_counter()
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+        self.latencies = []
+
+    def _record(self, text, tokens):
+        now = time.perf_counter()
+        self.frames += 1
+        self.bytes += len(text.encode("utf-8"))
+        self.latencies.extend(now - emitted_at[token] for token in tokens.split())
+
+    async def send_text(self, text):
+        self._record(text, text)
+        await asyncio.sleep(0)
+
+    async def send_json(self, frame):
+        text = json.dumps(frame, separators=(",", ":"))
+        self._record(text, frame.get("text", ""))
+        await asyncio.sleep(0)
+
+
+async def per_token(app, websocket, question):
+    """The previous controller: every astream_events event, one frame per token."""
+
+    payload = {"messages": [{"role": "user", "content": question}]}
+    async for event in app.astream_events(payload, version="v1"):
+        if event["event"] == "on_chat_model_stream":
+            token = event["data"]["chunk"].content
+            if token:
+                await websocket.send_text(token)
+
+
+async def coalesced(app, websocket, question):
+    payload = {"messages": [{"role": "user", "content": question}]}
+    stream = graph.answer_events(app.astream(payload, stream_mode=["messages", "updates"]))
+    async for event in coalesce_deltas(stream):
+        if event["type"] == "delta":
+            await websocket.send_json({"type": "delta", "text": event["text"]})
+        elif event["type"] == "sources":
+            await websocket.send_json({"type": "sources", "sources": event["sources"]})
+    await websocket.send_json({"type": "done"})
+
+
+async def run(mode, app, chats):
+    sockets = [FakeWebSocket() for _ in range(chats)]
+    start = time.perf_counter()
+    await asyncio.gather(*[mode(app, ws, f"question {i}") for i, ws in enumerate(sockets)])
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latency for ws in sockets for latency in ws.latencies)
+    return {
+        "tokens": len(latencies),
+        "frames": sum(ws.frames for ws in sockets),
+        "tokens_per_s": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=20)
+    parser.add_argument("--tokens", type=int, default=500)
+    parser.add_argument("--interval-ms", type=float, default=2)
+    args = parser.parse_args()
+
+    # Only the answer model takes time; retrieval and grading are instant
+    bench_concurrent_chats.LLM_LATENCY = 0
+    bench_concurrent_chats.EMBEDDING_LATENCY = 0
+    bench_concurrent_chats.VECTOR_QUERY_LATENCY = 0
+    graph.client = SimpleNamespace(embeddings=FakeEmbeddings())
+    graph.index = FakeIndex()
+    graph.response_model = FakeStreamingModel(tokens=args.tokens, interval=args.interval_ms / 1000)
+    graph.grader_model = FakeChatModel(reply="yes")
+    app = graph.workflow.compile()
+
+    for name, mode in (("per-token", per_token), ("coalesced", coalesced)):
+        result = await run(mode, app, args.chats)
+        print(f"{name:10s} {result['tokens']} tokens in {result['frames']} frames, "
+              f"{result['tokens_per_s']:.0f} tokens/s, p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+"""Micro-benchmark: local cached token counting vs. the chat-completions round trip.
+
+Run from the backend folder:
+    python benchmarks/bench_token_count.py            # local counter only
+    python benchmarks/bench_token_count.py --api      # also time the API path (needs OPENAI_API_KEY)
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from token_counter import count_tokens, clear_token_cache, to_openai_message  # noqa: E402
+
+
+def build_thread(n_messages):
+    """Build a synthetic conversation of alternating user/assistant turns."""
+
+    messages = [{"role": "system", "content": "You are a helpful AI assistant."}]
+    for i in range(n_messages - 1):
+        role = "user" if i % 2 == 0 else "assistant"
+        text = f"Message {i}: " + "Global affairs update on trade, diplomacy and security. " * 12
+        messages.append({"role": role, "content": text})
+    return messages
+
+
+def api_count_tokens(client, messages):
+    """The previous implementation: ask the API for usage.prompt_tokens."""
+
+    openai_messages = []
+    for msg in messages:
+        converted = to_openai_message(msg)
+        if converted:
+            openai_messages.append({"role": converted[0], "content": converted[1]})
+    response = client.chat.completions.create(
+        model="gpt-4o",
+        messages=openai_messages,
+        max_tokens=1,
+        stream=False
+    )
+    return response.usage.prompt_tokens
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    result = None
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--api", action="store_true", help="also time the chat-completions path")
+    args = parser.parse_args()
+
+    messages = build_thread(args.messages)
+
+    clear_token_cache()
+    tokens, cold = timed(lambda: count_tokens(messages), 1)
+    _, warm = timed(lambda: count_tokens(messages), args.repeat)
+
+    # A trim pass used to call the counter once per middle message
+    _, trim_pass = timed(lambda: [count_tokens(messages[:k]) for k in range(2, len(messages))], 1)
+
+    print(f"{len(messages)} messages, {tokens} tokens")
+    print(f"local cold:           {cold * 1000:9.3f} ms")
+    print(f"local warm (cached):  {warm * 1000:9.3f} ms")
+    print(f"local full trim pass: {trim_pass * 1000:9.3f} ms ({len(messages) - 2} counts)")
+
+    if args.api:
+        from openai import OpenAI
+
+        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        api_tokens, api_time = timed(lambda: api_count_tokens(client, messages), 3)
+        print(f"API round trip:       {api_time * 1000:9.3f} ms per count ({api_tokens} tokens)")
+        print(f"API full trim pass (estimated): {api_time * (len(messages) - 2):9.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Local vector store latency: exact vs. IVF search, with IVF recall@k.
+
+Run from the backend folder:
+    python benchmarks/bench_vector_store.py --vectors 2000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from embeddings.vector_store import LocalVectorStore  # noqa: E402
+
+
+def measure(store, queries, top_k):
+    latencies, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        res = store.query(q, top_k=top_k, include_metadata=True)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([m["id"] for m in res["matches"]])
+    return latencies, results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--nprobe", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # Clustered data, closer to real embeddings than uniform noise
+    centers = rng.normal(size=(32, args.dim))
+    data = centers[rng.integers(0, 32, args.vectors)] + 0.5 * rng.normal(size=(args.vectors, args.dim))
+    queries = data[rng.integers(0, args.vectors, args.queries)] + 0.1 * rng.normal(size=(args.queries, args.dim))
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = LocalVectorStore(directory=directory, dimension=args.dim, nprobe=args.nprobe)
+        start = time.perf_counter()
+        store.upsert([
+            {"id": str(i), "values": data[i], "metadata": {"url": f"https://example.com/{i}", "text": ""}}
+            for i in range(args.vectors)
+        ])
+        print(f"upsert {args.vectors} vectors: {time.perf_counter() - start:.2f} s")
+
+        exact_lat, exact_ids = measure(store, queries, args.top_k)
+        store.build_ivf()
+        ivf_lat, ivf_ids = measure(store, queries, args.top_k)
+
+    recall = statistics.mean(len(set(a) & set(b)) / len(a) for a, b in zip(exact_ids, ivf_ids))
+    for name, lat in (("exact", exact_lat), ("ivf", ivf_lat)):
+        lat.sort()
+        print(f"{name:5s} p50 {lat[len(lat) // 2]:.3f} ms  p99 {lat[int(len(lat) * 0.99) - 1]:.3f} ms")
+    print(f"ivf recall@{args.top_k}: {recall:.3f} (nprobe={args.nprobe})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# ===============================================================================
+# Checkpoint history pruning
+#
+# AsyncPostgresSaver keeps a checkpoint per node step, each with its pending
+# writes and the channel blobs it references. Only the latest checkpoint of a
+# thread is ever read, so older ones can go.
+#
+# Safe while chats are live:
+#   - the newest `keep` checkpoints of every (thread, namespace) are kept, and a
+#     running turn only adds newer ones;
+#   - a blob is only deleted if no remaining checkpoint references it AND its
+#     version is below the thread's latest version of that channel. In-flight
+#     writes always use higher versions, so a blob whose checkpoint row is not
+#     committed yet is never touched;
+#   - writes are only deleted for checkpoints older than the latest one.
+# Each thread is pruned in its own short transaction.
+
+import asyncio
+import os
+import time
+
+CHECKPOINT_TABLES = ("checkpoints", "checkpoint_writes", "checkpoint_blobs")
+
+CANDIDATE_THREADS_SQL = """
+SELECT thread_id
+FROM checkpoints
+GROUP BY thread_id
+HAVING count(*) > %(keep)s
+"""
+
+DELETE_CHECKPOINTS_SQL = """
+WITH ranked AS (
+    SELECT checkpoint_ns, checkpoint_id,
+           row_number() OVER (PARTITION BY checkpoint_ns ORDER BY checkpoint_id DESC) AS rank
+    FROM checkpoints
+    WHERE thread_id = %(thread_id)s
+), deleted AS (
+    DELETE FROM checkpoints c
+    USING ranked r
+    WHERE c.thread_id = %(thread_id)s
+      AND c.checkpoint_ns = r.checkpoint_ns
+      AND c.checkpoint_id = r.checkpoint_id
+      AND r.rank > %(keep)s
+    RETURNING pg_column_size(c.checkpoint) + pg_column_size(c.metadata) AS size
+)
+SELECT count(*) AS rows, COALESCE(sum(size), 0) AS bytes FROM deleted
+"""
+
+DELETE_WRITES_SQL = """
+WITH deleted AS (
+    DELETE FROM checkpoint_writes w
+    WHERE w.thread_id = %(thread_id)s
+      AND w.checkpoint_id < (
+          SELECT max(c.checkpoint_id) FROM checkpoints c
+          WHERE c.thread_id = w.thread_id AND c.checkpoint_ns = w.checkpoint_ns
+      )
+      AND NOT EXISTS (
+          SELECT 1 FROM checkpoints c
+          WHERE c.thread_id = w.thread_id
+            AND c.checkpoint_ns = w.checkpoint_ns
+            AND c.checkpoint_id = w.checkpoint_id
+      )
+    RETURNING pg_column_size(w.blob) AS size
+)
+SELECT count(*) AS rows, COALESCE(sum(size), 0) AS bytes FROM deleted
+"""
+
+DELETE_BLOBS_SQL = """
+WITH latest AS (
+    SELECT DISTINCT ON (checkpoint_ns) checkpoint_ns, checkpoint -> 'channel_versions' AS versions
+    FROM checkpoints
+    WHERE thread_id = %(thread_id)s
+    ORDER BY checkpoint_ns, checkpoint_id DESC
+), referenced AS (
+    SELECT c.checkpoint_ns, v.key AS channel, v.value AS version
+    FROM checkpoints c, jsonb_each_text(c.checkpoint -> 'channel_versions') v
+    WHERE c.thread_id = %(thread_id)s
+), deleted AS (
+    DELETE FROM checkpoint_blobs b
+    USING latest l
+    WHERE b.thread_id = %(thread_id)s
+      AND b.checkpoint_ns = l.checkpoint_ns
+      AND b.version < (l.versions ->> b.channel)
+      AND NOT EXISTS (
+          SELECT 1 FROM referenced r
+          WHERE r.checkpoint_ns = b.checkpoint_ns AND r.channel = b.channel AND r.version = b.version
+      )
+    RETURNING COALESCE(pg_column_size(b.blob), 0) AS size
+)
+SELECT count(*) AS rows, COALESCE(sum(size), 0) AS bytes FROM deleted
+"""
+
+TABLE_SIZE_SQL = "SELECT pg_total_relation_size(%(table)s::regclass) AS bytes"
+
+
+async def _table_sizes(conn):
+    sizes = {}
+    for table in CHECKPOINT_TABLES:
+        cur = await conn.execute(TABLE_SIZE_SQL, {"table": table})
+        sizes[table] = (await cur.fetchone())["bytes"]
+    return sizes
+
+
+async def _delete(conn, sql, params):
+    cur = await conn.execute(sql, params)
+    row = await cur.fetchone()
+    return row["rows"], row["bytes"]
+
+
+async def prune_checkpoints(conn, keep=1, dry_run=False, vacuum=True):
+    """Keep the newest `keep` checkpoints per thread and drop orphaned writes/blobs.
+
+    `conn` must be in autocommit mode (VACUUM cannot run in a transaction).
+    With dry_run the deletes run and are rolled back, so the counts are exact.
+    Returns a report of rows and bytes removed per table.
+    """
+
+    if keep < 1:
+        raise ValueError("keep must be at least 1")
+
+    started = time.perf_counter()
+    report = {
+        "dry_run": dry_run,
+        "keep": keep,
+        "threads_pruned": 0,
+        "rows_deleted": dict.fromkeys(CHECKPOINT_TABLES, 0),
+        "bytes_deleted": dict.fromkeys(CHECKPOINT_TABLES, 0),
+        "table_bytes_before": await _table_sizes(conn),
+    }
+
+    cur = await conn.execute(CANDIDATE_THREADS_SQL, {"keep": keep})
+    thread_ids = [row["thread_id"] for row in await cur.fetchall()]
+
+    for thread_id in thread_ids:
+        params = {"thread_id": thread_id, "keep": keep}
+        async with conn.transaction(force_rollback=dry_run):
+            # Checkpoints first: writes and blobs are orphaned relative to what remains
+            for table, sql in zip(CHECKPOINT_TABLES, (DELETE_CHECKPOINTS_SQL, DELETE_WRITES_SQL, DELETE_BLOBS_SQL)):
+                rows, size = await _delete(conn, sql, params)
+                report["rows_deleted"][table] += rows
+                report["bytes_deleted"][table] += size
+        report["threads_pruned"] += 1
+        await asyncio.sleep(0)  # yield to live requests between threads
+
+    if vacuum and not dry_run and thread_ids:
+        # Plain VACUUM marks the space reusable without locking out readers/writers
+        for table in CHECKPOINT_TABLES:
+            await conn.execute(f"VACUUM (ANALYZE) {table}")
+
+    report["table_bytes_after"] = await _table_sizes(conn)
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def format_report(report):
+    lines = [
+        f"{'Would prune' if report['dry_run'] else 'Pruned'} {report['threads_pruned']} threads "
+        f"(keeping {report['keep']} checkpoints each) in {report['seconds']} s"
+    ]
+    for table in CHECKPOINT_TABLES:
+        lines.append(
+            f"  {table:18s} {report['rows_deleted'][table]:8d} rows  {report['bytes_deleted'][table] / 1e3:10.1f} kB  "
+            f"(table {report['table_bytes_before'][table] / 1e3:.1f} -> {report['table_bytes_after'][table] / 1e3:.1f} kB)"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import psycopg
+    from dotenv import load_dotenv
+    from psycopg.rows import dict_row
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Prune LangGraph checkpoint history")
+    parser.add_argument("--keep", type=int, default=int(os.getenv("CHECKPOINT_KEEP", "1")))
+    parser.add_argument("--apply", action="store_true", help="delete (default: dry-run report only)")
+    parser.add_argument("--no-vacuum", action="store_true")
+    args = parser.parse_args()
+
+    db_uri = (
+        f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:"
+        f"{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}?sslmode=disable"
+    )
+
+    async def main():
+        async with await psycopg.AsyncConnection.connect(db_uri, autocommit=True, row_factory=dict_row) as conn:
+            report = await prune_checkpoints(conn, args.keep, dry_run=not args.apply, vacuum=not args.no_vacuum)
+        print(format_report(report))
+
+    asyncio.run(main())
@@ -0,0 +1,175 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+
+# ===============================================================================
+# Query-embedding cache: in-process LRU tier + optional SQLite tier on local disk
+
+def normalize_query(text):
+    """Case- and whitespace-insensitive form of a query used for cache keys."""
+
+    return " ".join(text.casefold().split())
+
+
+def cache_key(model, text):
+    return hashlib.sha256(f"{model}\x00{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Bounded LRU/TTL cache of query embeddings.
+
+    The memory tier is per process. When db_path is set, a SQLite file (WAL
+    mode) is used as a second tier that survives restarts and is shared by
+    all uvicorn workers on the host. It is bounded too: expired rows are
+    deleted, and the oldest rows beyond max_rows, when the file is opened and
+    every evict_every writes.
+    """
+
+    def __init__(self, max_entries=2048, ttl_seconds=86400, db_path=None, max_rows=100000, evict_every=500):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.max_rows = max_rows
+        self.evict_every = evict_every
+        self._memory = OrderedDict()
+        # get_memory runs on the event loop, get_persistent/put in executor threads
+        self._memory_lock = threading.Lock()
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._writes_since_evict = 0
+
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.miss_latency_total = 0.0
+        self.persistent_evictions = 0
+
+        if db_path:
+            self._open_db()
+
+    # ---- memory tier ----
+
+    def get_memory(self, model, text):
+        key = cache_key(model, text)
+        with self._memory_lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            embedding, expires_at = entry
+            if expires_at < time.time():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+        return embedding
+
+    def _put_memory(self, key, embedding, expires_at):
+        with self._memory_lock:
+            self._memory[key] = (embedding, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    # ---- persistent tier ----
+
+    @property
+    def persistent(self):
+        return self._db is not None
+
+    def _open_db(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=5)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings ("
+            " key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS query_embeddings_expires_at ON query_embeddings (expires_at)")
+        self._db.commit()
+        self.evict()
+
+    def get_persistent(self, model, text):
+        """Look a query up in the SQLite tier (blocking; run it off the event loop)."""
+
+        if self._db is None:
+            return None
+        key = cache_key(model, text)
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT vector, expires_at FROM query_embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+
+        embedding = array("f")
+        embedding.frombytes(row[0])
+        embedding = embedding.tolist()
+        self._put_memory(key, embedding, row[1])
+        self.persistent_hits += 1
+        return embedding
+
+    def evict(self):
+        """Delete expired rows, then the oldest rows beyond max_rows, from the SQLite tier."""
+
+        if self._db is None:
+            return 0
+        with self._db_lock:
+            expired = self._db.execute("DELETE FROM query_embeddings WHERE expires_at < ?", (time.time(),)).rowcount
+            # Every row gets the same TTL, so the earliest expiry is the oldest write
+            overflow = self._db.execute(
+                "DELETE FROM query_embeddings WHERE key IN ("
+                " SELECT key FROM query_embeddings ORDER BY expires_at"
+                " LIMIT max((SELECT count(*) FROM query_embeddings) - ?, 0))",
+                (self.max_rows,),
+            ).rowcount
+            self._db.commit()
+            self._writes_since_evict = 0
+        self.persistent_evictions += expired + overflow
+        return expired + overflow
+
+    # ---- both tiers ----
+
+    def put(self, model, text, embedding, miss_latency=None):
+        """Store an embedding fetched from the API (blocking when the SQLite tier is on)."""
+
+        self.misses += 1
+        if miss_latency is not None:
+            self.miss_latency_total += miss_latency
+
+        key = cache_key(model, text)
+        expires_at = time.time() + self.ttl_seconds
+        self._put_memory(key, embedding, expires_at)
+
+        if self._db is not None:
+            blob = array("f", embedding).tobytes()
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO query_embeddings (key, model, vector, expires_at) VALUES (?, ?, ?, ?)",
+                    (key, model, blob, expires_at),
+                )
+                self._db.commit()
+                self._writes_since_evict += 1
+                evict = self._writes_since_evict >= self.evict_every
+            if evict:
+                self.evict()
+
+    def stats(self):
+        hits = self.memory_hits + self.persistent_hits
+        lookups = hits + self.misses
+        avg_miss_ms = (self.miss_latency_total / self.misses * 1000) if self.misses else 0.0
+        return {
+            "memory_entries": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "persistent_evictions": self.persistent_evictions,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "embedding_calls_saved": hits,
+            "avg_miss_latency_ms": avg_miss_ms,
+            "estimated_latency_saved_ms": hits * avg_miss_ms,
+        }
@@ -0,0 +1,3 @@
+"""Embedding ingestion and vector store package."""
+
+
@@ -0,0 +1,120 @@
+import json
+import os
+import sys
+
+
+# ===============================================================================
+# JSON Lines article store
+#
+# One article per line, so the scraper appends without rewriting the file and
+# ingestion streams articles one at a time instead of loading the whole archive.
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ARTICLES_PATH = os.getenv("ARTICLES_PATH", os.path.join(BACKEND_DIR, "data", "reuters_articles.jsonl"))
+
+# JSON array files written before the store existed
+LEGACY_ARTICLE_FILES = [
+    os.path.join(BACKEND_DIR, "web scraping", "reuters_articles.json"),
+    os.path.join(BACKEND_DIR, "embeddings", "reuters_articles.json"),
+]
+
+
+def iter_articles(path=DEFAULT_ARTICLES_PATH):
+    """Yield articles one at a time; a truncated last line (crashed writer) is skipped."""
+
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Skipping unreadable line {line_number} in {path}")
+
+
+def iter_urls(path=DEFAULT_ARTICLES_PATH):
+    for article in iter_articles(path):
+        yield article.get("url")
+
+
+def append_articles(articles, path=DEFAULT_ARTICLES_PATH):
+    """Append articles to the store, flushing after each one."""
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    count = 0
+    with open(path, "a", encoding="utf-8") as f:
+        for article in articles:
+            f.write(json.dumps(article, ensure_ascii=False) + "\n")
+            f.flush()
+            count += 1
+    return count
+
+
+def iter_json_array(path, read_size=1 << 16):
+    """Stream the elements of a top-level JSON array without parsing the whole file."""
+
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = f.read(read_size).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{path} is not a JSON array")
+        buffer = buffer[1:]
+        eof = False
+        while True:
+            buffer = buffer.lstrip().lstrip(",").lstrip()
+            if buffer.startswith("]"):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                more = f.read(read_size)
+                eof = not more
+                buffer += more
+                continue
+            yield item
+            buffer = buffer[end:]
+
+
+def migrate(sources=LEGACY_ARTICLE_FILES, path=DEFAULT_ARTICLES_PATH):
+    """One-shot conversion of the legacy JSON arrays into the store.
+
+    Articles are deduplicated by URL (the first file wins); files are merged into
+    an existing store rather than overwriting it.
+    """
+
+    seen = set(iter_urls(path))
+
+    def unseen(articles):
+        for article in articles:
+            if article.get("url") not in seen:
+                seen.add(article.get("url"))
+                yield article
+
+    migrated = 0
+    for source in sources:
+        if not os.path.exists(source):
+            continue
+        count = append_articles(unseen(iter_json_array(source)), path)
+        print(f"Migrated {count} articles from {source}")
+        migrated += count
+    return migrated
+
+
+def ensure_store(path=DEFAULT_ARTICLES_PATH):
+    """Create the store from the legacy files the first time it is needed."""
+
+    if not os.path.exists(path):
+        migrate(path=path)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] != ["migrate"]:
+        print("usage: python article_store.py migrate [source.json ...]")
+        sys.exit(1)
+    total = migrate(sys.argv[2:] or LEGACY_ARTICLE_FILES)
+    print(f"{total} articles written to {DEFAULT_ARTICLES_PATH}")
@@ -0,0 +1,126 @@
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+
+
+# ===============================================================================
+# Lexical (BM25) index over the same chunks that are embedded
+#
+# Dense embeddings rank proper nouns (people, organisations, places) poorly;
+# BM25 ranks them well. Both result lists are merged with reciprocal-rank fusion.
+
+DEFAULT_BM25_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bm25_index.json")
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is",
+    "it", "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "what", "when",
+    "which", "who", "will", "with", "about", "how", "did", "does", "do", "latest", "news",
+}
+
+
+def tokenize(text):
+    return [t for t in TOKEN_PATTERN.findall(text.casefold()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """In-memory inverted index with Okapi BM25 scoring."""
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)   # term -> {doc_id: term frequency}
+        self.doc_lengths = {}
+        self.metadata = {}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, doc_id, text, metadata=None):
+        if doc_id in self.doc_lengths:
+            self.remove(doc_id)
+        terms = Counter(tokenize(text))
+        for term, tf in terms.items():
+            self.postings[term][doc_id] = tf
+        length = sum(terms.values())
+        self.doc_lengths[doc_id] = length
+        self.total_length += length
+        self.metadata[doc_id] = metadata or {}
+
+    def remove(self, doc_id):
+        length = self.doc_lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        metadata = self.metadata.pop(doc_id, None) or {}
+        # Only the chunk's own terms need visiting when its text is stored
+        terms = set(tokenize(metadata["text"])) if "text" in metadata else list(self.postings)
+        for term in terms:
+            docs = self.postings.get(term)
+            if docs is not None and docs.pop(doc_id, None) is not None and not docs:
+                del self.postings[term]
+
+    def search(self, query, top_k=10, predicate=None):
+        """Top documents for a query as Pinecone-style matches.
+
+        predicate(metadata) -> bool, if given, drops documents before ranking.
+        """
+
+        n_docs = len(self.doc_lengths)
+        if not n_docs:
+            return []
+        avg_length = self.total_length / n_docs
+
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        if predicate is not None:
+            scores = {doc_id: score for doc_id, score in scores.items() if predicate(self.metadata[doc_id])}
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [{"id": doc_id, "score": score, "metadata": self.metadata[doc_id]} for doc_id, score in ranked]
+
+    def save(self, path=DEFAULT_BM25_PATH):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "k1": self.k1,
+                "b": self.b,
+                "postings": self.postings,
+                "doc_lengths": self.doc_lengths,
+                "metadata": self.metadata,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=DEFAULT_BM25_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"])
+        index.postings = defaultdict(dict, data["postings"])
+        index.doc_lengths = data["doc_lengths"]
+        index.metadata = data["metadata"]
+        index.total_length = sum(index.doc_lengths.values())
+        return index
+
+
+def reciprocal_rank_fusion(result_lists, top_k, k=60):
+    """Merge ranked match lists by summing 1 / (k + rank) per document."""
+
+    fused = {}
+    for results in result_lists:
+        for rank, match in enumerate(results, start=1):
+            entry = fused.setdefault(match["id"], {"id": match["id"], "score": 0.0, "metadata": match["metadata"]})
+            entry["score"] += 1.0 / (k + rank)
+            if entry["metadata"] is None:
+                entry["metadata"] = match["metadata"]
+    return sorted(fused.values(), key=lambda m: m["score"], reverse=True)[:top_k]
@@ -0,0 +1,178 @@
+import hashlib
+import re
+from collections import defaultdict
+from urllib.parse import urlsplit, urlunsplit
+
+import numpy as np
+
+
+# ===============================================================================
+# Near-duplicate detection between scraping and embedding
+#
+# Articles: MinHash over word shingles with LSH banding; near-identical stories
+# (URL variants, updated versions) collapse to the freshest copy.
+# Chunks: 64-bit SimHash; a chunk within a few bits of one already indexed for
+# another article (boilerplate, paragraphs reused across stories) is skipped.
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+BANDS = 16  # 16 bands x 8 rows: pairs above ~0.7 Jaccard become candidates
+ARTICLE_THRESHOLD = 0.8  # estimated Jaccard at which two articles are the same story
+SIMHASH_DISTANCE = 3  # max differing bits; the index splits hashes into 4 blocks of 16
+MERSENNE_PRIME = (1 << 61) - 1
+
+
+def canonical_url(url):
+    """URL without query string or fragment (Reuters appends ?id=... variants)."""
+
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path.rstrip("/"), "", ""))
+
+
+def _hash(value, size):
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=size).digest(), "little")
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    words = WORD_PATTERN.findall(text.casefold())
+    return {" ".join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))} if words else set()
+
+
+class MinHasher:
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.default_rng(seed)
+        # a < 2^29 and shingle hashes < 2^32, so a * x + b never overflows uint64
+        self.a = rng.integers(1, 1 << 29, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        hashes = np.fromiter((_hash(s, 4) for s in shingles(text)), dtype=np.uint64)
+        if not len(hashes):
+            return None
+        return ((np.outer(hashes, self.a) + self.b) % MERSENNE_PRIME).min(axis=0)
+
+
+def find_duplicate_articles(articles, threshold=ARTICLE_THRESHOLD, bands=BANDS):
+    """Stream articles once and return {duplicate url: url of the copy that is kept}.
+
+    Within each cluster of near-duplicates the article with the latest
+    publication_date is kept (ties go to the one scraped last).
+    """
+
+    hasher = MinHasher()
+    rows = NUM_PERM // bands
+    urls, dates, signatures, parent = [], [], [], []
+    buckets = defaultdict(list)
+    by_canonical = {}
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        parent[find(i)] = find(j)
+
+    for i, article in enumerate(articles):
+        urls.append(article["url"])
+        dates.append(article.get("publication_date") or "")
+        parent.append(i)
+
+        canonical = canonical_url(article["url"])
+        if canonical in by_canonical:
+            union(i, by_canonical[canonical])
+        else:
+            by_canonical[canonical] = i
+
+        signature = hasher.signature(article.get("full_text") or "")
+        signatures.append(signature)
+        if signature is None:
+            continue
+        candidates = set()
+        for band in range(bands):
+            key = (band, signature[band * rows:(band + 1) * rows].tobytes())
+            candidates.update(buckets[key])
+            buckets[key].append(i)
+        for j in candidates:
+            if find(i) != find(j) and np.mean(signature == signatures[j]) >= threshold:
+                union(i, j)
+
+    clusters = defaultdict(list)
+    for i in range(len(urls)):
+        clusters[find(i)].append(i)
+
+    duplicates = {}
+    for members in clusters.values():
+        keep = max(members, key=lambda i: (dates[i], i))
+        for i in members:
+            if urls[i] != urls[keep]:
+                duplicates[urls[i]] = urls[keep]
+    return duplicates
+
+
+def simhash(text):
+    counts = defaultdict(int)
+    for feature in shingles(text, size=3):
+        counts[feature] += 1
+    if not counts:
+        return 0
+    hashes = np.fromiter((_hash(f, 8) for f in counts), dtype=np.uint64)
+    weights = np.fromiter(counts.values(), dtype=np.int64)
+    bits = ((hashes[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)).astype(np.int64)
+    totals = (weights[:, None] * (2 * bits - 1)).sum(axis=0)
+    return sum(1 << i for i in np.flatnonzero(totals > 0).tolist())
+
+
+class SimHashIndex:
+    """SimHashes of kept chunks and the article each belongs to.
+
+    Two hashes within SIMHASH_DISTANCE bits agree exactly on at least one of
+    four 16-bit blocks, so only hashes sharing a block are compared.
+    """
+
+    def __init__(self):
+        self.tables = [defaultdict(list) for _ in range(SIMHASH_DISTANCE + 1)]
+
+    @staticmethod
+    def _blocks(value):
+        return [(value >> (16 * k)) & 0xFFFF for k in range(SIMHASH_DISTANCE + 1)]
+
+    def add(self, value, owner):
+        for table, block in zip(self.tables, self._blocks(value)):
+            table[block].append((value, owner))
+
+    def find(self, value, exclude=None):
+        """Owner of a near-identical hash from another article, or None."""
+
+        for table, block in zip(self.tables, self._blocks(value)):
+            for other, owner in table.get(block, ()):
+                if owner != exclude and bin(value ^ other).count("1") <= SIMHASH_DISTANCE:
+                    return owner
+        return None
+
+
+class DedupReport:
+    def __init__(self, duplicate_articles=0):
+        self.duplicate_articles = duplicate_articles
+        self.duplicate_article_chunks = 0
+        self.near_duplicate_chunks = 0
+
+    @property
+    def embeddings_saved(self):
+        return self.duplicate_article_chunks + self.near_duplicate_chunks
+
+    def __str__(self):
+        return (f"{self.duplicate_articles} duplicate articles ({self.duplicate_article_chunks} chunks) "
+                f"and {self.near_duplicate_chunks} near-duplicate chunks skipped: "
+                f"{self.embeddings_saved} embeddings saved")
+
+
+if __name__ == "__main__":
+    from article_store import iter_articles
+
+    duplicates = find_duplicate_articles(iter_articles())
+    for dropped, kept in sorted(duplicates.items(), key=lambda item: item[1]):
+        print(f"{dropped}\n    -> {kept}")
+    print(f"{len(duplicates)} near-duplicate articles")
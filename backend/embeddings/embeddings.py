@@ -1,84 +1,173 @@
-import json
-import uuid
-from openai import OpenAI
-from pinecone import Pinecone, ServerlessSpec
+import asyncio
+from openai import AsyncOpenAI
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from dotenv import load_dotenv
 import os
 
+from vector_store import get_vector_store, published_timestamp, url_sections
+from article_store import DEFAULT_ARTICLES_PATH, ensure_store, iter_articles, iter_urls
+from bm25_index import BM25Index, DEFAULT_BM25_PATH
+from manifest import IngestManifest, chunk_id, write_index_version
+from dedup import DedupReport, SimHashIndex, find_duplicate_articles, simhash
+from pipeline import IngestStats, embed_with_retry, run_pipeline
+
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 INDEX_NAME = os.getenv("INDEX_NAME")
+EMBEDDING_MODEL = "text-embedding-3-small"
+BATCH_SIZE = 100
+MAX_IN_FLIGHT = int(os.getenv("EMBED_MAX_IN_FLIGHT", "4"))
 
-# --- Initialize clients ---
-client =  OpenAI(api_key=OPENAI_API_KEY)
-pc = Pinecone(api_key=PINECONE_API_KEY)
-
-# Create Pinecone index if it doesn't exist
-if INDEX_NAME not in [idx.name for idx in pc.list_indexes()]:
-    print(f"Creating index: {INDEX_NAME}")
-    pc.create_index(
-        name=INDEX_NAME,
-        dimension=1536,  # for text-embedding-3-small
-        metric="cosine",
-        spec=ServerlessSpec(cloud="aws", region="us-east-1")
-    )
+splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
 
-index = pc.Index(INDEX_NAME)
 
-# --- Load JSON articles ---
-with open("reuters_articles.json", "r", encoding="utf-8") as f:
-    articles = json.load(f)
+# --- Split an article into chunks with content-hash ids ---
+def chunk_article(article):
+    metadata = {
+        "title": article["title"],
+        "publication_date": article["publication_date"],
+        "url": article["url"],
+        # Filterable fields (Pinecone range filters need numbers, and rejects nulls)
+        "sections": url_sections(article["url"])
+    }
+    published_ts = published_timestamp(article["publication_date"])
+    if published_ts is not None:
+        metadata["published_ts"] = published_ts
 
-# --- Split into chunks ---
-splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-all_chunks = []
-
-for article in articles:
-    chunks = splitter.split_text(article["full_text"])
-    for chunk in chunks:
-        all_chunks.append({
-            "id": str(uuid.uuid4()),
-            "text": chunk,
-            "metadata": {
-                "title": article["title"],
-                "publication_date": article["publication_date"],
-                "url": article["url"]
-            }
-        })
-
-print(f"Total chunks to embed: {len(all_chunks)}")
-
-# --- Create embeddings in batches ---
-BATCH_SIZE = 100
-for i in range(0, len(all_chunks), BATCH_SIZE):
-    batch = all_chunks[i:i + BATCH_SIZE]
+    chunks = []
+    seen = set()
+    for text in splitter.split_text(article["full_text"]):
+        cid = chunk_id(article["url"], text)
+        if cid in seen:
+            continue
+        seen.add(cid)
+        chunks.append({"id": cid, "text": text, "metadata": metadata})
+    return chunks
+
+
+# --- Work out what changed since the last run ---
+def iter_chunks_to_embed(articles, manifest, bm25, rebuild_bm25, to_delete, report=None, dropped_urls=()):
+    """Yield chunks that still need embedding, updating manifest/BM25 as it goes.
+
+    Vector ids that are no longer needed are appended to to_delete; the list
+    is complete once the generator is exhausted. Chunks that are near-duplicates
+    of a chunk already kept for another article are dropped.
+
+    dropped_urls are indexed articles this run removes (superseded duplicates,
+    articles gone from the source); their chunks do not count as kept, so the
+    version replacing them is not skipped as a near-duplicate of itself.
+    """
+
+    report = report or DedupReport()
+    indexed_ids = manifest.all_chunk_ids()
+    seen_urls = set()
+    chunk_hashes = SimHashIndex()
+    for value, owner in manifest.iter_simhashes():
+        if owner not in dropped_urls:
+            chunk_hashes.add(value, owner)
+
+    for article in articles:
+        url = article["url"]
+        seen_urls.add(url)
+        if manifest.is_current(article) and (not rebuild_bm25 or manifest.is_retired(url)):
+            continue  # unchanged (articles removed by retention stay removed)
+
+        chunks, hashes = [], []
+        for item in chunk_article(article):
+            value = simhash(item["text"])
+            if chunk_hashes.find(value, exclude=url) is not None:
+                report.near_duplicate_chunks += 1
+                continue
+            chunk_hashes.add(value, url)
+            chunks.append(item)
+            hashes.append(value)
+        new_ids = {c["id"] for c in chunks}
+        old_ids = manifest.chunk_ids(url)
+
+        for item in chunks:
+            bm25.add(item["id"], item["text"], {**item["metadata"], "text": item["text"]})
+            if item["id"] not in indexed_ids:
+                yield item
+
+        for stale_id in old_ids - new_ids:
+            to_delete.append(stale_id)
+            bm25.remove(stale_id)
+        manifest.record(article, [c["id"] for c in chunks], hashes)
 
-    # Extract only text for embedding
-    texts = [item["text"] for item in batch]
+    # Articles that disappeared from the source
+    for url in [u for u in manifest.articles if u not in seen_urls]:
+        for stale_id in manifest.forget(url)["chunk_ids"]:
+            to_delete.append(stale_id)
+            bm25.remove(stale_id)
 
-    # Call OpenAI embedding API once for the whole batch
-    emb_response = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=texts
+
+def drop_duplicate_articles(articles, duplicates, report):
+    for article in articles:
+        if article["url"] in duplicates:
+            report.duplicate_article_chunks += len(chunk_article(article))
+            continue
+        yield article
+
+
+def delete_vectors(index, ids):
+    for i in range(0, len(ids), 1000):
+        index.delete(ids=ids[i:i + 1000])
+
+
+async def main():
+    # --- Initialize clients (retries are handled by the pipeline) ---
+    client = AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+
+    # Pinecone (created if missing) or the local index, depending on VECTOR_STORE
+    index = get_vector_store(INDEX_NAME, create=True)
+
+    # --- Stream articles from the JSONL store ---
+    ensure_store()
+
+    # --- Collapse near-duplicate articles to their freshest version ---
+    duplicates = find_duplicate_articles(iter_articles(DEFAULT_ARTICLES_PATH))
+    report = DedupReport(duplicate_articles=len(duplicates))
+    articles = drop_duplicate_articles(iter_articles(DEFAULT_ARTICLES_PATH), duplicates, report)
+
+    manifest = IngestManifest()
+    rebuild_bm25 = not os.path.exists(DEFAULT_BM25_PATH)
+    bm25 = BM25Index() if rebuild_bm25 else BM25Index.load(DEFAULT_BM25_PATH)
+
+    # Indexed articles this run drops: superseded versions and removed articles
+    source_urls = set(iter_urls(DEFAULT_ARTICLES_PATH))
+    dropped_urls = set(duplicates) | {url for url in manifest.articles if url not in source_urls}
+
+    # --- Embed and upsert new chunks, overlapping requests and uploads ---
+    to_delete = []
+    stats = IngestStats()
+    await run_pipeline(
+        iter_chunks_to_embed(articles, manifest, bm25, rebuild_bm25, to_delete, report, dropped_urls),
+        lambda texts: embed_with_retry(client, EMBEDDING_MODEL, texts, stats),
+        index.upsert,
+        batch_size=BATCH_SIZE,
+        max_in_flight=MAX_IN_FLIGHT,
+        stats=stats,
     )
+    print(f"Embedded {stats}")
+    print(f"Dedup: {report}")
+
+    if to_delete:
+        delete_vectors(index, to_delete)
+        print(f"Deleted {len(to_delete)} stale vectors")
+    index.flush()
+
+    # Manifest last: a crashed run is simply redone (ids are deterministic)
+    bm25.save(DEFAULT_BM25_PATH)
+    manifest.save()
+
+    if stats.chunks or to_delete:
+        # --- Mark the index as re-ingested so cached answers are invalidated ---
+        write_index_version()
+        print("Index updated successfully!")
+    else:
+        print("Index already up to date.")
+
 
-    # Prepare Pinecone vectors
-    vectors = []
-    for j, emb_data in enumerate(emb_response.data):
-        vectors.append({
-            "id": batch[j]["id"],
-            "values": emb_data.embedding,
-            "metadata": {
-                **batch[j]["metadata"],
-                "text": batch[j]["text"]
-            }
-        })
-
-    # Upload to Pinecone
-    index.upsert(vectors=vectors)
-    print(f"Uploaded batch {i // BATCH_SIZE + 1}")
-
-print("All embeddings uploaded successfully!")
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import time
+
+
+# ===============================================================================
+# Ingest manifest: what has already been embedded, per article
+#
+# Chunk ids are content hashes, so re-running ingestion upserts the same ids
+# instead of piling up duplicates, and unchanged chunks are never re-embedded.
+
+DEFAULT_MANIFEST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ingest_manifest.json")
+INDEX_VERSION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "index_version.txt")
+MANIFEST_VERSION = 2  # 2: chunks carry published_ts / sections metadata
+
+
+def chunk_id(url, text):
+    """Deterministic vector id for a chunk of an article."""
+
+    return hashlib.sha256(f"{url}\x00{text}".encode("utf-8")).hexdigest()[:32]
+
+
+def article_hash(article):
+    """Hash of everything in an article that ends up in the index."""
+
+    payload = json.dumps(
+        [article.get("title"), article.get("publication_date"), article.get("full_text")],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class IngestManifest:
+    """url -> {"hash", "publication_date", "chunk_ids", "simhashes"} for every indexed article."""
+
+    def __init__(self, path=DEFAULT_MANIFEST_PATH):
+        self.path = path
+        self.articles = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.articles = data["articles"]
+            else:
+                print("Manifest version changed; every article will be re-indexed")
+
+    def is_current(self, article):
+        entry = self.articles.get(article["url"])
+        return entry is not None and entry["hash"] == article_hash(article)
+
+    def chunk_ids(self, url):
+        entry = self.articles.get(url)
+        return set(entry["chunk_ids"]) if entry else set()
+
+    def all_chunk_ids(self):
+        return {cid for entry in self.articles.values() for cid in entry["chunk_ids"]}
+
+    def record(self, article, ids, simhashes=None):
+        self.articles[article["url"]] = {
+            "hash": article_hash(article),
+            "publication_date": article.get("publication_date"),
+            "chunk_ids": list(ids),
+            "simhashes": list(simhashes or []),
+        }
+
+    def iter_simhashes(self):
+        """(simhash, url) for every indexed chunk recorded with one."""
+
+        for url, entry in self.articles.items():
+            for value in entry.get("simhashes", []):
+                yield value, url
+
+    def forget(self, url):
+        return self.articles.pop(url, None)
+
+    def is_retired(self, url):
+        entry = self.articles.get(url)
+        return entry is not None and entry.get("retention") is not None
+
+    def retire(self, url, mode, ids):
+        """Record that retention replaced an article's chunks with `ids` (possibly none)."""
+
+        entry = self.articles[url]
+        entry["chunk_ids"] = list(ids)
+        entry["simhashes"] = []
+        entry["retention"] = mode
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "articles": self.articles}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def write_index_version():
+    """Mark the index as changed so cached answers are invalidated."""
+
+    with open(INDEX_VERSION_PATH, "w", encoding="utf-8") as f:
+        f.write(str(time.time()))
@@ -0,0 +1,135 @@
+import asyncio
+import random
+import time
+
+import openai
+
+
+# ===============================================================================
+# Streaming embed/upsert pipeline
+#
+# Chunks are pulled lazily from a generator, up to `max_in_flight` embedding
+# requests run at once, and upserts happen on a separate worker while the
+# next batches are being embedded.
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+
+class IngestStats:
+    def __init__(self):
+        self.chunks = 0
+        self.batches = 0
+        self.retries = 0
+        self.started = time.perf_counter()
+        self.finished = None
+
+    @property
+    def seconds(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def throughput(self):
+        return self.chunks / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (f"{self.chunks} chunks in {self.batches} batches, {self.seconds:.2f} s "
+                f"({self.throughput:.1f} chunks/s, {self.retries} retries)")
+
+
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _retry_delay(error, attempt, base_delay, max_delay):
+    """Honour Retry-After when the API sends it, else exponential backoff with jitter."""
+
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), max_delay)
+        except ValueError:
+            pass
+    return min(base_delay * 2 ** attempt, max_delay) * (0.5 + random.random() / 2)
+
+
+async def embed_with_retry(client, model, texts, stats=None, max_retries=6, base_delay=1.0, max_delay=30.0):
+    """Embed a batch of texts, retrying rate limits and transient errors."""
+
+    for attempt in range(max_retries + 1):
+        try:
+            response = await client.embeddings.create(model=model, input=texts)
+            return [item.embedding for item in response.data]
+        except RETRYABLE_ERRORS as error:
+            if attempt == max_retries:
+                raise
+            if stats is not None:
+                stats.retries += 1
+            delay = _retry_delay(error, attempt, base_delay, max_delay)
+            print(f"Embedding batch failed ({type(error).__name__}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+async def run_pipeline(chunks, embed_batch, upsert, batch_size=100, max_in_flight=4, stats=None):
+    """Embed and upsert chunks with bounded concurrency.
+
+    chunks:      iterable (usually a generator) of {"id", "text", "metadata"}
+    embed_batch: async fn(texts) -> list of vectors
+    upsert:      blocking fn(vectors), run in a worker thread
+    """
+
+    stats = stats or IngestStats()
+    batches = batched(chunks, batch_size)
+    upsert_queue = asyncio.Queue(maxsize=max_in_flight)
+
+    async def embed_worker():
+        # The generator is only advanced from the event loop thread, one worker at a time
+        for batch in batches:
+            values = await embed_batch([item["text"] for item in batch])
+            vectors = [
+                {"id": item["id"], "values": vec, "metadata": {**item["metadata"], "text": item["text"]}}
+                for item, vec in zip(batch, values)
+            ]
+            await upsert_queue.put(vectors)
+
+    async def upsert_worker():
+        while True:
+            vectors = await upsert_queue.get()
+            if vectors is None:
+                return
+            await asyncio.to_thread(upsert, vectors)
+            stats.chunks += len(vectors)
+            stats.batches += 1
+            print(f"Uploaded batch {stats.batches} ({stats.throughput:.1f} chunks/s)")
+
+    async def produce():
+        workers = [asyncio.create_task(embed_worker()) for _ in range(max_in_flight)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+        await upsert_queue.put(None)
+
+    # Stop both sides as soon as either fails
+    tasks = {asyncio.create_task(produce()), asyncio.create_task(upsert_worker())}
+    done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    for task in pending:
+        task.cancel()
+    for task in done:
+        task.result()
+
+    stats.finished = time.perf_counter()
+    return stats
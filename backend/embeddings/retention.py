@@ -0,0 +1,182 @@
+import argparse
+import gzip
+import json
+import os
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from vector_store import EMBEDDING_DIMENSION, get_vector_store, published_timestamp
+from bm25_index import BM25Index, DEFAULT_BM25_PATH
+from manifest import IngestManifest, chunk_id, write_index_version
+
+load_dotenv()
+
+
+# ===============================================================================
+# Retention for old news vectors
+#
+# Articles whose publication_date is older than the retention age leave the index:
+#   delete     their vectors are removed
+#   archive    vectors (values + metadata) are appended to a gzip JSONL file first
+#   summarize  all chunks are replaced by one vector per article: the normalised
+#              mean of its chunk vectors, with the title and lead as text
+# The manifest records the outcome, so ingestion does not re-embed them.
+
+INDEX_NAME = os.getenv("INDEX_NAME")
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "365"))
+RETENTION_MODE = os.getenv("RETENTION_MODE", "archive")
+MODES = ("delete", "archive", "summarize")
+DEFAULT_ARCHIVE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "retention_archive.jsonl.gz")
+ARTICLES_PER_BATCH = 20
+FETCH_BATCH = 100
+VECTOR_BYTES = EMBEDDING_DIMENSION * 4
+
+
+def summary_id(url):
+    return chunk_id(url, "\x00summary")
+
+
+class RetentionReport:
+    def __init__(self, mode, max_age_days, dry_run):
+        self.mode = mode
+        self.max_age_days = max_age_days
+        self.dry_run = dry_run
+        self.articles = 0
+        self.vectors_removed = 0
+        self.summaries_added = 0
+        self.undated = 0
+
+    @property
+    def vectors_reclaimed(self):
+        return self.vectors_removed - self.summaries_added
+
+    def __str__(self):
+        verb = "would remove" if self.dry_run else "removed"
+        return (f"[{self.mode}{', dry run' if self.dry_run else ''}] older than {self.max_age_days} days: "
+                f"{self.articles} articles, {verb} {self.vectors_removed} vectors, "
+                f"{self.summaries_added} summary vectors, net {self.vectors_reclaimed} vectors "
+                f"(~{self.vectors_reclaimed * VECTOR_BYTES / 1e6:.1f} MB of vector data); "
+                f"{self.undated} articles without a date are kept")
+
+
+def expired_articles(manifest, cutoff_ts, report):
+    """(url, entry) for every indexed article published before the cutoff."""
+
+    expired = []
+    for url, entry in manifest.articles.items():
+        if manifest.is_retired(url):
+            continue
+        ts = published_timestamp(entry.get("publication_date"))
+        if ts is None:
+            report.undated += 1
+        elif ts < cutoff_ts:
+            expired.append((url, entry))
+    return expired
+
+
+def summarize_article(url, ids, fetched, bm25):
+    """One vector for a whole article: mean of its chunk vectors, lead chunk as text."""
+
+    rows = [fetched[i] for i in ids if i in fetched]
+    if not rows:
+        return None
+    mean = np.mean([row["values"] for row in rows], axis=0)
+    norm = np.linalg.norm(mean)
+    lead = bm25.metadata.get(ids[0], {}).get("text") or rows[0]["metadata"].get("text", "")
+    metadata = {key: value for key, value in rows[0]["metadata"].items() if key != "text"}
+    metadata["text"] = f"{metadata.get('title', '')}\n{lead}"
+    metadata["summary"] = True
+    return {"id": summary_id(url), "values": (mean / norm if norm else mean).tolist(), "metadata": metadata}
+
+
+def run_retention(index, manifest, bm25, max_age_days=RETENTION_DAYS, mode=RETENTION_MODE,
+                  dry_run=True, archive_path=DEFAULT_ARCHIVE_PATH, now=None):
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}")
+
+    report = RetentionReport(mode, max_age_days, dry_run)
+    cutoff_ts = (now or time.time()) - max_age_days * 86400
+    expired = expired_articles(manifest, cutoff_ts, report)
+    report.articles = len(expired)
+    report.vectors_removed = sum(len(entry["chunk_ids"]) for _, entry in expired)
+    if mode == "summarize":
+        report.summaries_added = sum(1 for _, entry in expired if entry["chunk_ids"])
+    if dry_run or not expired:
+        return report
+
+    archive = gzip.open(archive_path, "at", encoding="utf-8") if mode == "archive" else None
+    try:
+        for start in range(0, len(expired), ARTICLES_PER_BATCH):
+            batch = expired[start:start + ARTICLES_PER_BATCH]
+            ids = [cid for _, entry in batch for cid in entry["chunk_ids"]]
+            fetched = {}
+            if mode != "delete":
+                # Long articles give a batch many chunk ids; keep each fetch request small
+                for i in range(0, len(ids), FETCH_BATCH):
+                    fetched.update(index.fetch(ids[i:i + FETCH_BATCH]))
+
+            summaries = {}
+            for url, entry in batch:
+                if mode == "archive":
+                    for cid in entry["chunk_ids"]:
+                        if cid in fetched:
+                            archive.write(json.dumps({"id": cid, "url": url, **fetched[cid]}) + "\n")
+                elif mode == "summarize" and entry["chunk_ids"]:
+                    summary = summarize_article(url, entry["chunk_ids"], fetched, bm25)
+                    if summary:
+                        summaries[url] = summary
+            if archive:
+                archive.flush()  # archived before anything is deleted
+
+            if summaries:
+                index.upsert(list(summaries.values()))
+            for i in range(0, len(ids), 1000):
+                index.delete(ids=ids[i:i + 1000])
+
+            for url, entry in batch:
+                for cid in entry["chunk_ids"]:
+                    bm25.remove(cid)
+                summary = summaries.get(url)
+                if summary:
+                    bm25.add(summary["id"], summary["metadata"]["text"], summary["metadata"])
+                manifest.retire(url, mode, [summary["id"]] if summary else [])
+            print(f"Retired {min(start + ARTICLES_PER_BATCH, len(expired))}/{len(expired)} articles")
+    finally:
+        if archive:
+            archive.close()
+
+    index.flush()
+    if hasattr(index, "compact"):
+        index.compact()  # local store: drop the deleted rows from disk
+    bm25.save(DEFAULT_BM25_PATH)
+    manifest.save()
+    write_index_version()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove, archive or summarise vectors of old articles")
+    parser.add_argument("--max-age-days", type=int, default=RETENTION_DAYS)
+    parser.add_argument("--mode", choices=MODES, default=RETENTION_MODE)
+    parser.add_argument("--apply", action="store_true", help="make changes (default: dry-run report only)")
+    parser.add_argument("--archive-path", default=DEFAULT_ARCHIVE_PATH)
+    parser.add_argument("--interval-hours", type=float, default=None,
+                        help="keep running and repeat every N hours (for a scheduled job)")
+    args = parser.parse_args()
+
+    index = get_vector_store(INDEX_NAME)
+    while True:
+        manifest = IngestManifest()
+        bm25 = BM25Index.load(DEFAULT_BM25_PATH) if os.path.exists(DEFAULT_BM25_PATH) else BM25Index()
+        report = run_retention(index, manifest, bm25, args.max_age_days, args.mode,
+                               dry_run=not args.apply, archive_path=args.archive_path)
+        print(report)
+        if args.interval_hours is None:
+            break
+        time.sleep(args.interval_hours * 3600)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,21 @@
 import os
 from dotenv import load_dotenv
 from openai import OpenAI
-from pinecone import Pinecone
+
+from vector_store import get_vector_store
 
 # Load environment variables
 load_dotenv()
 
 # Get API keys
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 INDEX_NAME = "news-articles"  
 
 # Initialize clients
 client = OpenAI(api_key=OPENAI_API_KEY)
-pc = Pinecone(api_key=PINECONE_API_KEY)
 
-# Connect to existing index
-index = pc.Index(INDEX_NAME)
+# Connect to existing index (VECTOR_STORE=pinecone|local)
+index = get_vector_store(INDEX_NAME)
 
 # --- Run search ---
 query = "African Development Bank loan to South Africa for energy and rail infrastructure improvements"
@@ -27,7 +26,7 @@ query_emb = client.embeddings.create(
     input=query
 ).data[0].embedding
 
-# Query Pinecone
+# Query the vector store
 results = index.query(
     vector=query_emb,
     top_k=3,
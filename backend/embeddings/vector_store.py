@@ -0,0 +1,499 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import numpy as np
+
+
+# ===============================================================================
+# Vector store interface
+#
+# Both stores answer query(vector, top_k, include_metadata, filter) with a dict
+# shaped like Pinecone's response ({"matches": [{"id", "score", "metadata"}]}) and
+# accept upsert(vectors) with Pinecone-style {"id", "values", "metadata"} items.
+# Writers call flush() once they are done (a no-op for Pinecone).
+
+EMBEDDING_DIMENSION = 1536  # text-embedding-3-small
+DEFAULT_LOCAL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "local_index")
+
+
+# ===============================================================================
+# Metadata filters
+#
+# Chunks carry published_ts (epoch seconds, since Pinecone only range-filters
+# numbers) and sections (URL path prefixes, e.g. ["world", "world/india"]).
+# Filters use Pinecone's syntax; LocalVectorStore and BM25 evaluate them with
+# metadata_matches.
+
+def url_sections(url):
+    """Section prefixes of an article URL, without the article slug."""
+
+    parts = [p.lower() for p in urlsplit(url).path.split("/") if p][:-1]
+    return ["/".join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+
+def published_timestamp(publication_date):
+    if not publication_date:
+        return None
+    try:
+        parsed = datetime.fromisoformat(publication_date)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def build_filter(start_date=None, end_date=None, section=None):
+    """Pinecone-style filter for a date range (inclusive, YYYY-MM-DD) and section; None if empty."""
+
+    clauses = []
+    start = published_timestamp(start_date)
+    if start is not None:
+        clauses.append({"published_ts": {"$gte": start}})
+    end = published_timestamp(end_date)
+    if end is not None:
+        if len(end_date) == len("YYYY-MM-DD"):
+            end += 86399  # whole end day
+        clauses.append({"published_ts": {"$lte": end}})
+    if section and section.strip("/"):
+        clauses.append({"sections": {"$eq": section.strip("/").lower()}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+_COMPARISONS = {
+    "$eq": lambda value, operand: value == operand,
+    "$in": lambda value, operand: value in operand,
+    "$gt": lambda value, operand: value > operand,
+    "$gte": lambda value, operand: value >= operand,
+    "$lt": lambda value, operand: value < operand,
+    "$lte": lambda value, operand: value <= operand,
+}
+
+
+def metadata_matches(metadata, flt):
+    """Evaluate a Pinecone-style filter; list fields match if any element does."""
+
+    for key, condition in flt.items():
+        if key == "$and":
+            if not all(metadata_matches(metadata, c) for c in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(metadata_matches(metadata, c) for c in condition):
+                return False
+            continue
+
+        value = metadata.get(key)
+        values = value if isinstance(value, list) else [value]
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, operand in condition.items():
+            if op == "$ne":
+                ok = operand not in values
+            elif op == "$nin":
+                ok = not any(v in operand for v in values)
+            elif op == "$exists":
+                ok = (value is not None) == operand
+            else:
+                ok = any(v is not None and _COMPARISONS[op](v, operand) for v in values)
+            if not ok:
+                return False
+    return True
+
+
+def apply_recency_decay(matches, half_life_days, weight):
+    """Rescore by age relative to the newest match and re-sort.
+
+    score * (1 - weight + weight * 0.5 ** (age_days / half_life_days)); matches
+    without a date get the full penalty. Scores are assumed non-negative (BM25,
+    cosine similarity of text embeddings).
+    """
+
+    stamps = [
+        m["metadata"].get("published_ts") or published_timestamp(m["metadata"].get("publication_date"))
+        for m in matches
+    ]
+    known = [ts for ts in stamps if ts is not None]
+    if not known:
+        return matches
+    newest = max(known)
+    rescored = []
+    for match, ts in zip(matches, stamps):
+        decay = 0.5 ** ((newest - ts) / 86400 / half_life_days) if ts is not None else 0.0
+        rescored.append({**match, "score": match["score"] * (1 - weight + weight * decay)})
+    return sorted(rescored, key=lambda m: m["score"], reverse=True)
+
+
+class PineconeVectorStore:
+    """Thin wrapper around a remote Pinecone index."""
+
+    def __init__(self, index):
+        self.index = index
+
+    def query(self, vector, top_k, include_metadata=True, filter=None):
+        kwargs = {"vector": vector, "top_k": top_k, "include_metadata": include_metadata}
+        if filter:
+            kwargs["filter"] = filter
+        return self.index.query(**kwargs)
+
+    def upsert(self, vectors):
+        return self.index.upsert(vectors=vectors)
+
+    def delete(self, ids):
+        return self.index.delete(ids=ids)
+
+    def flush(self):
+        pass  # every write is already persisted by Pinecone
+
+    def fetch(self, ids):
+        vectors = self.index.fetch(ids=ids).vectors
+        return {vid: {"values": list(v.values), "metadata": v.metadata or {}} for vid, v in vectors.items()}
+
+
+class LocalVectorStore:
+    """In-process vector index on a memory-mapped float32 matrix.
+
+    Files in `directory`:
+      vectors*.f32  row-major (capacity, dim) matrix of unit-normalised vectors;
+                    compact() writes a new file, and meta.json names the current one
+      meta.json     ids and metadata per row (None id = deleted row)
+      ivf.npz       optional IVF centroids and row assignments
+
+    Search is exact cosine by default. After build_ivf(), mode="ivf" only
+    scans the rows of the `nprobe` nearest centroids.
+
+    Upserts and deletes are written to meta.json by flush(), once per run.
+    Readers reload when meta.json is replaced, so a long-running server picks
+    up ingestion, retention and compaction done by other processes.
+    """
+
+    def __init__(self, directory=DEFAULT_LOCAL_DIR, dimension=EMBEDDING_DIMENSION, mode="exact", nprobe=4):
+        self.directory = directory
+        self.dimension = dimension
+        self.mode = mode
+        self.nprobe = nprobe
+        self._lock = threading.Lock()
+
+        self._ids = []
+        self._metadata = []
+        self._positions = {}
+        self._matrix = None
+        self._live_mask = None
+        self._centroids = None
+        self._assignments = None
+        self._meta_signature = None
+        self._vectors_file = "vectors.f32"
+        self._dirty = False
+
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    # ---- persistence ----
+
+    @property
+    def _vectors_path(self):
+        return os.path.join(self.directory, self._vectors_file)
+
+    @property
+    def _meta_path(self):
+        return os.path.join(self.directory, "meta.json")
+
+    @property
+    def _ivf_path(self):
+        return os.path.join(self.directory, "ivf.npz")
+
+    def _stat_meta(self):
+        """(inode, mtime, size) of meta.json; changes whenever a writer saves."""
+
+        try:
+            stat = os.stat(self._meta_path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load(self):
+        self._meta_signature = self._stat_meta()
+        if self._meta_signature is not None:
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self._vectors_file = meta.get("vectors_file", "vectors.f32")
+            if not os.path.exists(self._vectors_path) and self._stat_meta() != self._meta_signature:
+                return self._load()  # compacted while we read; this file is already deleted
+            self.dimension = meta["dimension"]
+            self._ids = meta["ids"]
+            self._metadata = meta["metadata"]
+            self._positions = {vid: i for i, vid in enumerate(self._ids) if vid is not None}
+        self._open_matrix(max(len(self._ids), 1))
+        self._live_mask = None
+
+        if os.path.exists(self._ivf_path):
+            ivf = np.load(self._ivf_path)
+            self._centroids = ivf["centroids"]
+            self._assignments = ivf["assignments"]
+
+    def _reload_if_changed(self):
+        """Reload after another process saved the index (call with the lock held)."""
+
+        if not self._dirty and self._stat_meta() != self._meta_signature:
+            self._load()
+
+    def _open_matrix(self, min_rows):
+        """Map the vectors file, growing it (by doubling) to hold min_rows rows."""
+
+        row_bytes = self.dimension * 4
+        current_rows = os.path.getsize(self._vectors_path) // row_bytes if os.path.exists(self._vectors_path) else 0
+        if current_rows < min_rows:
+            new_rows = max(min_rows, current_rows * 2, 64)
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(new_rows * row_bytes)
+            current_rows = new_rows
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(current_rows, self.dimension))
+
+    def _save(self):
+        self._matrix.flush()
+        if self._centroids is not None:
+            np.savez(self._ivf_path, centroids=self._centroids, assignments=self._assignments)
+        # meta.json last: replacing it is what tells readers to reload
+        tmp_path = self._meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"dimension": self.dimension, "vectors_file": self._vectors_file,
+                       "ids": self._ids, "metadata": self._metadata}, f)
+        os.replace(tmp_path, self._meta_path)
+        self._meta_signature = self._stat_meta()
+        self._dirty = False
+        self._live_mask = None
+
+    def flush(self):
+        """Persist upserts and deletes made since the last flush."""
+
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    # ---- writes ----
+
+    def upsert(self, vectors):
+        with self._lock:
+            self._reload_if_changed()
+            for item in vectors:
+                values = np.asarray(item["values"], dtype=np.float32)
+                norm = np.linalg.norm(values)
+                if norm:
+                    values = values / norm
+
+                row = self._positions.get(item["id"])
+                if row is None:
+                    row = len(self._ids)
+                    if row >= self._matrix.shape[0]:
+                        self._matrix.flush()
+                        self._open_matrix(row + 1)
+                    self._ids.append(item["id"])
+                    self._metadata.append(item.get("metadata", {}))
+                    self._positions[item["id"]] = row
+                    if self._assignments is not None:
+                        self._assignments = np.append(self._assignments, np.int32(self._nearest_centroid(values)))
+                else:
+                    self._metadata[row] = item.get("metadata", {})
+                    if self._assignments is not None:
+                        self._assignments[row] = self._nearest_centroid(values)
+                self._matrix[row] = values
+            self._dirty = True
+            self._live_mask = None
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, ids):
+        with self._lock:
+            self._reload_if_changed()
+            for vid in ids:
+                row = self._positions.pop(vid, None)
+                if row is not None:
+                    self._ids[row] = None
+                    self._metadata[row] = None
+                    self._matrix[row] = 0.0
+            self._dirty = True
+            self._live_mask = None
+
+    def fetch(self, ids):
+        """{id: {"values", "metadata"}} for the ids that exist (values are unit-normalised)."""
+
+        with self._lock:
+            self._reload_if_changed()
+            return {
+                vid: {"values": self._matrix[row].tolist(), "metadata": self._metadata[row]}
+                for vid in ids
+                if (row := self._positions.get(vid)) is not None
+            }
+
+    def compact(self):
+        """Rewrite the matrix without deleted rows."""
+
+        with self._lock:
+            self._reload_if_changed()
+            live = [i for i, vid in enumerate(self._ids) if vid is not None]
+            vectors = np.array(self._matrix[live]) if live else np.zeros((0, self.dimension), dtype=np.float32)
+            self._ids = [self._ids[i] for i in live]
+            self._metadata = [self._metadata[i] for i in live]
+            self._positions = {vid: i for i, vid in enumerate(self._ids)}
+            if self._assignments is not None:
+                self._assignments = self._assignments[live]
+
+            # Write a new file rather than rewriting this one, and switch to it
+            # by replacing meta.json: readers see either the old file and rows
+            # or the new ones, never a mix. The old file goes last.
+            del self._matrix
+            old_path = self._vectors_path
+            self._vectors_file = f"vectors.{time.time_ns()}.f32"
+            vectors.tofile(self._vectors_path)
+            self._open_matrix(max(len(live), 1))
+            self._save()
+            try:
+                os.remove(old_path)
+            except OSError as exc:
+                print(f"Could not remove old vectors file {old_path}: {exc}")
+
+    # ---- approximate index ----
+
+    def _nearest_centroid(self, vector):
+        return int(np.argmax(self._centroids @ vector))
+
+    def build_ivf(self, n_lists=None, iterations=10, seed=0):
+        """Cluster live rows with spherical k-means and enable mode="ivf"."""
+
+        with self._lock:
+            self._reload_if_changed()
+            live = np.array([i for i, vid in enumerate(self._ids) if vid is not None])
+            if len(live) == 0:
+                return
+            n_lists = n_lists or max(1, int(np.sqrt(len(live))))
+            data = np.asarray(self._matrix[live])
+
+            rng = np.random.default_rng(seed)
+            centroids = data[rng.choice(len(data), size=min(n_lists, len(data)), replace=False)]
+            for _ in range(iterations):
+                labels = np.argmax(data @ centroids.T, axis=1)
+                for c in range(len(centroids)):
+                    members = data[labels == c]
+                    if len(members):
+                        center = members.mean(axis=0)
+                        norm = np.linalg.norm(center)
+                        centroids[c] = center / norm if norm else center
+
+            self._centroids = centroids
+            assignments = np.full(len(self._ids), -1, dtype=np.int32)
+            assignments[live] = np.argmax(data @ centroids.T, axis=1)
+            self._assignments = assignments
+            self.mode = "ivf"
+            self._save()
+
+    # ---- reads ----
+
+    def _live_rows(self):
+        if self._live_mask is None:
+            self._live_mask = np.array([vid is not None for vid in self._ids], dtype=bool)
+        return self._live_mask
+
+    def _candidate_rows(self, query_vector, filter=None):
+        """Rows to score: all live rows, or only those in the nearest IVF lists.
+
+        With a filter, the matching rows are scored exactly (no IVF probing):
+        the filter already narrows the set, and probing could miss all of them.
+        """
+
+        mask = self._live_rows()
+        if filter:
+            return np.array(
+                [i for i in np.flatnonzero(mask) if metadata_matches(self._metadata[i], filter)],
+                dtype=np.int64,
+            )
+        if self.mode == "ivf" and self._centroids is not None:
+            probes = np.argsort(-(self._centroids @ query_vector))[:self.nprobe]
+            mask = mask & np.isin(self._assignments[:len(mask)], probes)
+        return np.nonzero(mask)[0]
+
+    def query(self, vector, top_k, include_metadata=True, filter=None):
+        query_vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query_vector)
+        if norm:
+            query_vector = query_vector / norm
+
+        # Snapshot under the lock; scoring runs without it. Writers only append
+        # rows or blank them in place, and swap in new lists/matrices otherwise
+        with self._lock:
+            self._reload_if_changed()
+            count = len(self._ids)
+            if count == 0:
+                return {"matches": []}
+            rows = self._candidate_rows(query_vector, filter)
+            matrix, ids, metadata = self._matrix, self._ids, self._metadata
+
+        if len(rows) == count:
+            scores = matrix[:count] @ query_vector
+        else:
+            scores = matrix[rows] @ query_vector
+
+        k = min(top_k, len(rows))
+        if k == 0:
+            return {"matches": []}
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        matches = []
+        for i in top:
+            row = int(rows[i])
+            if ids[row] is None:
+                continue  # deleted while this query was scoring
+            match = {"id": ids[row], "score": float(scores[i])}
+            if include_metadata:
+                match["metadata"] = metadata[row]
+            matches.append(match)
+        return {"matches": matches}
+
+
+def get_vector_store(index_name=None, create=False, dimension=EMBEDDING_DIMENSION):
+    """Vector store selected by VECTOR_STORE ("pinecone" by default, or "local")."""
+
+    backend = os.getenv("VECTOR_STORE", "pinecone").lower()
+
+    if backend == "local":
+        return LocalVectorStore(
+            directory=os.getenv("LOCAL_INDEX_DIR", DEFAULT_LOCAL_DIR),
+            dimension=dimension,
+            mode=os.getenv("LOCAL_INDEX_MODE", "exact"),
+            nprobe=int(os.getenv("LOCAL_INDEX_NPROBE", "4")),
+        )
+
+    from pinecone import Pinecone, ServerlessSpec
+
+    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+    if create and index_name not in [idx.name for idx in pc.list_indexes()]:
+        print(f"Creating index: {index_name}")
+        pc.create_index(
+            name=index_name,
+            dimension=dimension,
+            metric="cosine",
+            spec=ServerlessSpec(cloud="aws", region="us-east-1")
+        )
+    return PineconeVectorStore(pc.Index(index_name))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Maintain the local vector index")
+    parser.add_argument("command", choices=["build-ivf", "compact"])
+    parser.add_argument("--lists", type=int, default=None, help="number of IVF lists (default: sqrt(n))")
+    args = parser.parse_args()
+
+    store = LocalVectorStore(directory=os.getenv("LOCAL_INDEX_DIR", DEFAULT_LOCAL_DIR))
+    if args.command == "build-ivf":
+        store.build_ivf(n_lists=args.lists)
+        print(f"IVF built with {len(store._centroids)} lists over {len(store._positions)} vectors")
+    else:
+        store.compact()
+        print(f"Compacted to {len(store._ids)} vectors")
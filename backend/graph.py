@@ -1,19 +1,38 @@
 from langgraph.graph import MessagesState
-from langchain_openai import ChatOpenAI
 import os
 from dotenv import load_dotenv
-from openai import OpenAI
-from pinecone import Pinecone
-from typing import Literal
+from openai import AsyncOpenAI
+from typing import Literal, Optional
 from langgraph.graph import StateGraph, START, END
 from langgraph.prebuilt import ToolNode
 from langgraph.prebuilt import tools_condition
 from langchain.schema import AIMessage
+from langchain_core.messages import RemoveMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
-from psycopg import AsyncConnection
+from psycopg_pool import AsyncConnectionPool
 from psycopg.rows import dict_row
-
-from prompts import GRADE_PROMPT, REWRITE_PROMPT, GENERATE_PROMPT, sys_msg
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
+import contextlib
+import json
+import time
+
+from prompts import GRADE_PROMPT, REWRITE_PROMPT, GENERATE_PROMPT, sys_msg, system_message
+from token_counter import count_tokens as local_count_tokens
+from message_trimmer import MessageTrimmer
+from embedding_cache import EmbeddingCache
+from embeddings.vector_store import get_vector_store, build_filter, metadata_matches, apply_recency_decay
+from embeddings.bm25_index import BM25Index, DEFAULT_BM25_PATH, reciprocal_rank_fusion
+from answer_cache import SemanticAnswerCache, replay_answer_events, tool_output_sources
+from model_router import ModelRouter, UsageTracker
+from relevance_grader import GRADER_MODE, RelevanceGrade, offline_grade, parse_grade
+from checkpoint_pruning import prune_checkpoints
+from thread_index import (
+    setup_thread_index, record_thread_turn, list_threads, backfill_thread_index,
+    make_title, thread_owner, first_human_message,
+)
 
 
 # Load environment variables
@@ -29,37 +48,130 @@ DB_NAME = os.getenv("DB_NAME")
 
 DB_URI = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}?sslmode=disable"
 
+# Connection pool settings
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "600"))
+DB_POOL_RECONNECT_TIMEOUT = float(os.getenv("DB_POOL_RECONNECT_TIMEOUT", "300"))
+
+# Checkpoint history pruning: keep the newest CHECKPOINT_KEEP per thread,
+# every CHECKPOINT_PRUNE_INTERVAL_HOURS (0 = only on demand)
+CHECKPOINT_KEEP = int(os.getenv("CHECKPOINT_KEEP", "1"))
+CHECKPOINT_PRUNE_INTERVAL_HOURS = float(os.getenv("CHECKPOINT_PRUNE_INTERVAL_HOURS", "0"))
+_prune_task = None
+
 # Global variables
 checkpointer = None
 graph = None
-_conn = None
+_pool = None
+_rebuild_task = None
+
+
+def _on_reconnect_failed(pool):
+    print(f"Database pool '{pool.name}' could not reconnect within {DB_POOL_RECONNECT_TIMEOUT}s")
+
 
 async def setup_checkpointer():
-    """Initialize the async PostgreSQL checkpointer"""
+    """Initialize the async PostgreSQL checkpointer on a connection pool"""
     
     global checkpointer
-    global _conn
-    
-    # Use psycopg AsyncConnection
-    _conn = await AsyncConnection.connect(
-        DB_URI,
-        autocommit=True,
-        row_factory=dict_row
-    )
-    checkpointer = AsyncPostgresSaver(_conn)
+    global _pool
+    
+    if _pool is None:
+        # Connections are health-checked on checkout and re-created when lost
+        _pool = AsyncConnectionPool(
+            DB_URI,
+            min_size=DB_POOL_MIN_SIZE,
+            max_size=DB_POOL_MAX_SIZE,
+            timeout=DB_POOL_TIMEOUT,
+            max_idle=DB_POOL_MAX_IDLE,
+            reconnect_timeout=DB_POOL_RECONNECT_TIMEOUT,
+            reconnect_failed=_on_reconnect_failed,
+            check=AsyncConnectionPool.check_connection,
+            kwargs={
+                "autocommit": True,
+                "prepare_threshold": 0,
+                "row_factory": dict_row,
+            },
+            name="checkpointer",
+            open=False,
+        )
+        try:
+            await _pool.open(wait=True, timeout=DB_POOL_TIMEOUT)
+        except Exception:
+            # A pool that failed to open is closed for good; start over next call
+            pool, _pool = _pool, None
+            await pool.close()
+            raise
+
+    checkpointer = AsyncPostgresSaver(_pool)
 
     await checkpointer.setup()
+
+    # Threads created before the index existed are picked up once, in the background
+    # (the task is kept referenced so it is not garbage-collected while running)
+    global _rebuild_task
+    async with _pool.connection() as conn:
+        if await setup_thread_index(conn) and _rebuild_task is None:
+            _rebuild_task = asyncio.create_task(rebuild_thread_index())
+
+    global _prune_task
+    if CHECKPOINT_PRUNE_INTERVAL_HOURS > 0 and _prune_task is None:
+        _prune_task = asyncio.create_task(prune_checkpoints_periodically())
     return checkpointer
 
 
 async def shutdown_checkpointer():
-    """Close DB connection if open."""
-    global _conn
+    """Close the connection pool if open."""
+    global _pool, _prune_task, _rebuild_task
+    if _prune_task is not None:
+        _prune_task.cancel()
+        _prune_task = None
+    if _rebuild_task is not None:
+        _rebuild_task.cancel()
+        _rebuild_task = None
     try:
-        if _conn is not None:
-            await _conn.close()
+        if _pool is not None:
+            await _pool.close()
     except Exception:
         pass
+    _pool = None
+
+
+async def prune_checkpoint_history(keep: int = CHECKPOINT_KEEP, dry_run: bool = False):
+    """Drop old checkpoints and orphaned writes/blobs; returns the pruning report."""
+
+    if _pool is None:
+        await setup_checkpointer()
+    async with _pool.connection() as conn:
+        return await prune_checkpoints(conn, keep=keep, dry_run=dry_run)
+
+
+async def prune_checkpoints_periodically():
+    while True:
+        await asyncio.sleep(CHECKPOINT_PRUNE_INTERVAL_HOURS * 3600)
+        try:
+            report = await prune_checkpoint_history()
+            print(f"Checkpoint pruning: {report['rows_deleted']} rows, {report['bytes_deleted']} bytes")
+        except Exception as exc:
+            print(f"Checkpoint pruning failed: {exc}")
+
+
+def get_pool_stats():
+    """Connection pool counters plus derived wait-time and utilisation figures."""
+
+    if _pool is None:
+        return None
+
+    stats = _pool.get_stats()
+    in_use = stats.get("pool_size", 0) - stats.get("pool_available", 0)
+    queued = stats.get("requests_queued", 0)
+    stats["connections_in_use"] = in_use
+    stats["utilisation"] = in_use / _pool.max_size if _pool.max_size else 0.0
+    stats["avg_wait_ms"] = stats.get("requests_wait_ms", 0) / queued if queued else 0.0
+    return stats
+
 
 async def get_graph():
     """Get or initialize the compiled graph with checkpointer"""
@@ -67,48 +179,186 @@ async def get_graph():
     global checkpointer, graph
     
     if graph is None:
-        checkpointer = await setup_checkpointer()
+        if checkpointer is None:
+            checkpointer = await setup_checkpointer()
         graph = workflow.compile(checkpointer=checkpointer)
     
     return graph    
 
 
 # ===============================================================================
-# Initialize OpenAI and Pinecone clients
+# Initialize OpenAI client and vector store
 
 # Get API keys
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 INDEX_NAME = "news-articles"  
 
 # Initialize clients
-client = OpenAI(api_key=OPENAI_API_KEY)
-pc = Pinecone(api_key=PINECONE_API_KEY)
+client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+
+# Connect to existing index (VECTOR_STORE=pinecone|local)
+index = get_vector_store(INDEX_NAME)
+
+# Thread pool for blocking calls (vector queries) so they never stall the event loop
+GRAPH_EXECUTOR_WORKERS = int(os.getenv("GRAPH_EXECUTOR_WORKERS", "16"))
+executor = ThreadPoolExecutor(max_workers=GRAPH_EXECUTOR_WORKERS, thread_name_prefix="graph-io")
+
+
+def set_executor(new_executor):
+    """Replace the executor used for blocking calls made by graph nodes."""
+
+    global executor
+    executor = new_executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking function on the graph executor."""
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(func, *args, **kwargs))
+
+
+# Query-embedding cache (set EMBEDDING_CACHE_DB to share a SQLite tier across workers/restarts)
+EMBEDDING_MODEL = "text-embedding-3-small"
+embedding_cache = EmbeddingCache(
+    max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", "2048")),
+    ttl_seconds=int(os.getenv("EMBEDDING_CACHE_TTL", "86400")),
+    db_path=os.getenv("EMBEDDING_CACHE_DB"),
+    max_rows=int(os.getenv("EMBEDDING_CACHE_DB_ROWS", "100000")),
+)
+
+
+async def embed_query(query: str):
+    """Embed a query, serving repeats from the embedding cache."""
+
+    embedding = embedding_cache.get_memory(EMBEDDING_MODEL, query)
+    if embedding is None and embedding_cache.persistent:
+        embedding = await run_blocking(embedding_cache.get_persistent, EMBEDDING_MODEL, query)
+    if embedding is not None:
+        return embedding
+
+    start = time.perf_counter()
+    embedding_response = await client.embeddings.create(
+        model=EMBEDDING_MODEL,
+        input=query
+    )
+    embedding = embedding_response.data[0].embedding
+    latency = time.perf_counter() - start
+
+    if embedding_cache.persistent:
+        await run_blocking(embedding_cache.put, EMBEDDING_MODEL, query, embedding, latency)
+    else:
+        embedding_cache.put(EMBEDDING_MODEL, query, embedding, latency)
+    return embedding
+
+
+# Hybrid retrieval: BM25 index built by embeddings.py, fused with dense results
+RETRIEVAL_TOP_K = 3
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "10"))
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
+BM25_INDEX_PATH = os.getenv("BM25_INDEX_PATH", DEFAULT_BM25_PATH)
+
+# "Latest" questions: search only the last RECENT_WINDOW_DAYS first, and decay older hits
+RECENT_WINDOW_DAYS = int(os.getenv("RECENT_WINDOW_DAYS", "30"))
+RECENCY_HALF_LIFE_DAYS = float(os.getenv("RECENCY_HALF_LIFE_DAYS", "7"))
+RECENCY_WEIGHT = float(os.getenv("RECENCY_WEIGHT", "0.5"))
+
+_bm25_index = None
+_bm25_mtime = None
+
+
+def get_bm25_index():
+    """Load the BM25 index, reloading it after a re-ingest; None if it was never built."""
+
+    global _bm25_index, _bm25_mtime
+    try:
+        mtime = os.path.getmtime(BM25_INDEX_PATH)
+    except OSError:
+        return None
+    if mtime != _bm25_mtime:
+        _bm25_index = BM25Index.load(BM25_INDEX_PATH)
+        _bm25_mtime = mtime
+    return _bm25_index
+
+
+def lexical_search(query: str, top_k: int, metadata_filter=None):
+    """BM25 matches for a query (blocking; runs on the executor)."""
+
+    if not HYBRID_RETRIEVAL:
+        return []
+    bm25 = get_bm25_index()
+    if not bm25:
+        return []
+    predicate = partial(metadata_matches, flt=metadata_filter) if metadata_filter else None
+    return bm25.search(query, top_k=top_k, predicate=predicate)
+
+
+async def search_index(query: str, metadata_filter=None, prefer_recent=False):
+    """Dense + BM25 search with a metadata pre-filter, fused into the top results."""
+
+    # Create embedding for query (cached) while the lexical index is searched
+    query_emb, lexical_matches = await asyncio.gather(
+        embed_query(query),
+        run_blocking(lexical_search, query, RETRIEVAL_CANDIDATES, metadata_filter),
+    )
+
+    # Query the vector store (sync client) on the executor
+    results = await run_blocking(
+        index.query,
+        vector=query_emb,
+        top_k=RETRIEVAL_CANDIDATES if lexical_matches or prefer_recent else RETRIEVAL_TOP_K,
+        include_metadata=True,
+        filter=metadata_filter
+    )
+
+    matches = results["matches"]
+    # Dense cosine scores survive fusion/decay as "similarity" (used by the offline grader)
+    similarity = {match["id"]: match["score"] for match in matches}
+    if prefer_recent:
+        matches = apply_recency_decay(matches, RECENCY_HALF_LIFE_DAYS, RECENCY_WEIGHT)
+        lexical_matches = apply_recency_decay(lexical_matches, RECENCY_HALF_LIFE_DAYS, RECENCY_WEIGHT)
+
+    # Merge dense and BM25 rankings
+    if lexical_matches:
+        matches = reciprocal_rank_fusion([matches, lexical_matches], top_k=RETRIEVAL_TOP_K)
+    return [{**match, "similarity": similarity.get(match["id"])} for match in matches[:RETRIEVAL_TOP_K]]
 
-# Connect to existing index
-index = pc.Index(INDEX_NAME)
 
 # Define retriever tool
-def retriever_tool(query: str):
+async def retriever_tool(
+    query: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    section: Optional[str] = None,
+    prefer_recent: bool = False,
+):
     # print("Retrieving documents for query...")
 
-    """Retrieve relevant documents from Pinecone index based on the query."""
+    """Retrieve relevant documents from the news index based on the query.
+
+    Args:
+        query: The search query.
+        start_date: Only articles published on or after this date (YYYY-MM-DD).
+        end_date: Only articles published on or before this date (YYYY-MM-DD).
+        section: Only articles from this news section, e.g. "world/india" or "world/europe".
+        prefer_recent: Rank newer articles higher; set for "latest"/"recent" questions.
+    """
     
     print("Retriever_tool called Now Retrieving documents for query...")
     print("Query:", query)
-    
-    # Create embedding for query
-    query_emb = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=query
-    ).data[0].embedding
 
-    # Query Pinecone
-    results = index.query(
-        vector=query_emb,
-        top_k=3,
-        include_metadata=True
-    )
+    metadata_filter = build_filter(start_date, end_date, section)
+    matches = []
+    if prefer_recent and not start_date:
+        # Search the recent window first; fall back to everything if it is empty
+        window_start = time.strftime("%Y-%m-%d", time.gmtime(time.time() - RECENT_WINDOW_DAYS * 86400))
+        matches = await search_index(query, build_filter(window_start, end_date, section), prefer_recent)
+    if not matches:
+        matches = await search_index(query, metadata_filter, prefer_recent)
+    if not matches and metadata_filter is not None:
+        # Nothing matches the dates/section the model picked; search everything
+        # rather than sending the grader an empty context to rewrite forever
+        matches = await search_index(query, None, prefer_recent)
 
     # Format results
     return [
@@ -116,25 +366,64 @@ def retriever_tool(query: str):
             # "score": match["score"],
             # "title": match["metadata"]["title"],
             "url": match["metadata"]["url"],
-            "snippet": match["metadata"]["text"][:200] + "..."
-        } for match in results["matches"]
+            "publication_date": match["metadata"].get("publication_date"),
+            "snippet": match["metadata"]["text"][:200] + "...",
+            **({"similarity": round(match["similarity"], 3)} if match.get("similarity") is not None else {}),
+        } for match in matches
     ]
 
 # ===============================================================================
 # Define the response model and generate_query_or_respond
 
-response_model = ChatOpenAI(model="gpt-4.1", temperature=0, streaming=True)
+# Models per role (RESPONSE_MODEL / GRADE_MODEL / REWRITE_MODEL); usage per node
+model_router = ModelRouter()
+usage_tracker = UsageTracker()
+
+response_model = model_router.chat_model("response", streaming=True, stream_usage=True)
+
+
+def current_question(messages):
+    """The latest user message, i.e. the question this turn is answering."""
+
+    for msg in reversed(messages):
+        if getattr(msg, "type", None) == "human":
+            return msg.content
+    return ""
+
+
+def model_input(state: MessagesState, config: RunnableConfig):
+    """Messages the model sees: system prompt plus the thread, trimmed to max_tokens.
+
+    The checkpoint always keeps the full history; trimming only shapes this view.
+    """
+
+    messages = state["messages"]
+    first = messages[0] if messages else None
+    is_system = first is not None and (
+        first.get("role") == "system" if isinstance(first, dict) else getattr(first, "type", None) == "system"
+    )
+    # Threads store only user/assistant/tool messages; older threads also stored
+    # the system prompt, which is replaced so the model always sees today's date
+    today = time.strftime("%Y-%m-%d", time.gmtime())
+    messages = [system_message(today)] + list(messages[1:] if is_system else messages)
+
+    configurable = config.get("configurable", {})
+    max_tokens = configurable.get("max_tokens")
+    if not max_tokens:
+        return messages
+    return trim_messages(messages, max_tokens, configurable.get("thread_id"))
+
 
-def generate_query_or_respond(state: MessagesState):
+async def generate_query_or_respond(state: MessagesState, config: RunnableConfig):
     """Call the model to generate a response based on the current state. Given
     the question, it will decide to retrieve using the retriever tool, or simply respond to the user.
     """
 
     print("generate_query_or_respond called")
     
-    response = (
+    response = await (
         response_model
-        .bind_tools([retriever_tool]).invoke(state["messages"])
+        .bind_tools([retriever_tool]).ainvoke(model_input(state, config))
     )
     # print(response.content)
     return {"messages": [response]}
@@ -143,80 +432,121 @@ def generate_query_or_respond(state: MessagesState):
 # ==============================================================================
 # Grading documents for relevance
 
-grader_model = ChatOpenAI(model="gpt-4.1", temperature=0)
+class AgentState(MessagesState):
+    # Retrieved chunks that passed grading; the context for generate_answer
+    relevant_documents: list
+
+
+# Small model, output constrained to {"binary_score": "yes" | "no"}
+grader_model = (
+    model_router.chat_model("grade")
+    .with_structured_output(RelevanceGrade, method="json_schema", strict=True)
+)
 
-def grade_documents(state: MessagesState) -> Literal["generate_answer", "rewrite_question"]:
-    """Determine whether the retrieved documents are relevant to the question."""
+async def grade_document(question: str, document: dict) -> str:
+    """'yes'/'no' for one retrieved chunk: offline when clear (GRADER_MODE=hybrid), else the grader model."""
+
+    if GRADER_MODE == "hybrid":
+        score = offline_grade(question, [document])
+        if score:
+            usage_tracker.count("grade_documents", f"offline_{score}")
+            return score
+
+    prompt = GRADE_PROMPT.format(question=question, context=json.dumps(document, ensure_ascii=False))
+    response = await grader_model.ainvoke([{"role": "user", "content": prompt}])
+    score = parse_grade(response)
+    usage_tracker.count("grade_documents", f"model_{score}")
+    return score
+
+
+async def grade_documents(state: AgentState):
+    """Grade every retrieved chunk concurrently and keep only the relevant ones."""
     
     print("grade_documents called")
     
-    question = state["messages"][-2].content
-    context = state["messages"][-1].content
-    
+    question = current_question(state["messages"])
+    documents = tool_output_sources(state["messages"][-1])
 
-    prompt = GRADE_PROMPT.format(question=question, context=context)
-    
-    response = grader_model.invoke([{"role": "user", "content": prompt}])
-    print("Grader response:", response.content)
+    scores = await asyncio.gather(*(grade_document(question, document) for document in documents))
+    relevant = [document for document, score in zip(documents, scores) if score == "yes"]
+    print(f"Grader: {len(relevant)}/{len(documents)} documents relevant")
+    return {"relevant_documents": relevant}
 
-    # score = response.binary_score
 
-    response_text = response.content.lower().strip()
-    if "yes" in response_text:
-        score = "yes"
-    else:
-        score = "no"
+def route_after_grading(state: AgentState) -> Literal["generate_answer", "rewrite_question"]:
+    """Answer from the relevant chunks; rewrite the question only when none passed."""
 
-    if score == "yes":
+    if state.get("relevant_documents"):
         print("Documents are relevant.")
         return "generate_answer"
-    else:
-        print("question ----> ", question, "\n", "context ----> ", context)
-        print("Documents are not relevant, rewrite the question.")
-        return "rewrite_question"
+    print("Documents are not relevant, rewrite the question.")
+    return "rewrite_question"
     
 # ==========================================================================
 # Rewrite the question to improve semantic intent
 
-def rewrite_question(state: MessagesState):
+rewrite_model = model_router.chat_model("rewrite")
+
+async def rewrite_question(state: MessagesState):
     """Rewrite the original user question."""
     
-    messages = state["messages"]
-    question = messages[-2].content
+    question = current_question(state["messages"])
 
     print("Rewriting question...", question)
     
     prompt = REWRITE_PROMPT.format(question=question)
-    response = response_model.invoke([{"role": "user", "content": prompt}])
+    response = await rewrite_model.ainvoke([{"role": "user", "content": prompt}])
     # print(response.content)
     return {"messages": [AIMessage(content=response.content)]}   
 
 # ==========================================================================
 # Generate the final answer based on the retrieved documents
 
-def generate_answer(state: MessagesState):
-    """Generate an answer."""
+async def generate_answer(state: AgentState):
+    """Generate an answer from the chunks that passed grading."""
     
     print("generate_answer called")
 
-    question = state["messages"][-2].content
-    context = state["messages"][-1].content
+    question = current_question(state["messages"])
+    documents = state.get("relevant_documents")
+    if documents:
+        context = json.dumps([{"url": doc.get("url"), "snippet": doc.get("snippet")} for doc in documents], ensure_ascii=False)
+    else:
+        context = state["messages"][-1].content
     # print("Context for answer generation: ------------>", context)
     
     prompt = GENERATE_PROMPT.format(question=question, context=context)
     
-    response = response_model.invoke([{"role": "user", "content": prompt}])
+    response = await response_model.ainvoke([{"role": "user", "content": prompt}])
     
     return {"messages": [response]}
 
 
+# ==========================================================================
+# Semantic answer cache (invalidated when embeddings.py re-ingests the index)
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+answer_cache = SemanticAnswerCache(
+    threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+    ttl_seconds=int(os.getenv("ANSWER_CACHE_TTL", "21600")),
+    min_ttl_seconds=int(os.getenv("ANSWER_CACHE_MIN_TTL", "900")),
+    max_ttl_seconds=int(os.getenv("ANSWER_CACHE_MAX_TTL", "86400")),
+    max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "500")),
+    version_file=os.getenv(
+        "INDEX_VERSION_FILE",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "embeddings", "index_version.txt"),
+    ),
+)
+
+
 # ==========================================================================
 # Define the workflow
-workflow = StateGraph(MessagesState)
+workflow = StateGraph(AgentState)
 
 # Define the nodes we will cycle between
 workflow.add_node(generate_query_or_respond)
 workflow.add_node("retrieve", ToolNode([retriever_tool]))
+workflow.add_node(grade_documents)
 workflow.add_node(rewrite_question)
 workflow.add_node(generate_answer)
 
@@ -235,12 +565,9 @@ workflow.add_conditional_edges(
     },
 )
 
-# Edges taken after the `action` node is called.
-workflow.add_conditional_edges(
-    "retrieve",
-    # Assess agent decision
-    grade_documents,
-)
+# Retrieved chunks are graded, then answered from or rewritten
+workflow.add_edge("retrieve", "grade_documents")
+workflow.add_conditional_edges("grade_documents", route_after_grading)
 workflow.add_edge("generate_answer", END)
 workflow.add_edge("rewrite_question", "generate_query_or_respond")
 
@@ -249,115 +576,179 @@ workflow.add_edge("rewrite_question", "generate_query_or_respond")
 # ==========================================================================
 
 def count_tokens(messages):
-    """Count tokens in messages using OpenAI's chat model."""
+    """Count tokens in messages locally using the model's tokenizer.
+
+    Per-message counts are memoized, so re-counting a long thread only
+    tokenizes the messages that have not been seen before.
+    """
     
-    print("count_tokens called")
     try:
-        # Convert to OpenAI format
-        openai_messages = []
-        for msg in messages:
-            role = msg.get("role") if isinstance(msg, dict) else getattr(msg, 'type', 'unknown')
-            content = msg.get("content") if isinstance(msg, dict) else getattr(msg, 'content', '')
-            
-            # Convert LangChain roles to OpenAI roles
-            if role == "human":
-                role = "user"
-            elif role == "ai":
-                role = "assistant"
-            elif role == "tool":
-                # convert tool messages to user message for token counting
-                role = "user"
-                content = f"Tool result: {content}" 
-            
-            # Only add messages with valid content
-            if content and role in ["user", "assistant", "system"]:
-                openai_messages.append({"role": role, "content": str(content)})
-
-        # Use OpenAI's chat completion to get token count
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=openai_messages,
-            max_tokens=1,  # We only want the token count, not the response
-            stream=False
-        )
-        return response.usage.prompt_tokens
+        return local_count_tokens(messages)
     except Exception as e:
         print(f"Error counting tokens: {e}")
 
 
-def trim_messages(messages, max_tokens):
-    """Trim messages to stay within token limit while preserving conversation flow."""
+message_trimmer = MessageTrimmer()
+
+def trim_messages(messages, max_tokens, thread_id=None):
+    """Trim messages to stay within token limit while preserving conversation flow.
+
+    Keeps the system message, the original user query, the current turn and as
+    many of the most recent whole turns as fit. Running totals are cached per
+    thread_id, so each new turn only counts the messages added since the
+    previous one.
+    """
     
     print("trim_messages called")
     if not messages:
         print("No messages are available to trim.")
         return messages
     
-    # Always keep the first message (original user query) and last few messages
     if len(messages) <= 2:
         print("Messages lengths are short, no trimming needed.")
         return messages
     
-    # Check if current messages exceed token limit
-    current_tokens = count_tokens(messages)
-    
-    if current_tokens <= max_tokens:
-        print(f"Current token count ({current_tokens}) is within the limit ({max_tokens}). No trimming needed.")
-        return messages
-    
-    print(f"Token limit exceeded ({current_tokens} > {max_tokens}). Trimming messages...")
-    
-    # Strategy: Keep first message, system message last 2-3 messages, and trim middle
-    system_msgs = [msg for msg in messages if (msg.get("role") if isinstance(msg, dict) else getattr(msg, 'type', None)) == "system"]
-    first_msg = messages[1]  # Original user query
-    last_msgs = messages[-2:]  # Recent conversation
-    
-    # Start with essential messages
-    trimmed = system_msgs + [first_msg] + last_msgs
-    
-    # Add messages from the end working backwards until we hit token limit ()
-    # Preserve [Some middle] messages
-    for msg in reversed(messages[1:-2]):
-        test_messages = [first_msg, msg] + last_msgs
-        if count_tokens(test_messages) <= max_tokens:
-            trimmed.insert(-2, msg)  # Insert before last_msgs
-        else:
-            break
-    
-    final_tokens = count_tokens(trimmed)
-    print(f"Trimmed to {len(trimmed)} messages ({final_tokens} tokens)")
-    
-    return trimmed 
+    return message_trimmer.trim(messages, max_tokens, thread_id)
 # ==========================================================================
 
-async def run_workflow(query: str, thread_id: str, max_tokens):
+async def run_workflow(query: str, thread_id: str, max_tokens, user_id: str = None):
     """Run the workflow with the given query."""
 
     # Get the initialized graph
     graph = await get_graph()
 
     print("run_workflow called with thread_id:", thread_id)
-    
-    # Fetch the full conversation before starting
-    existing_messages = await get_full_conversation(thread_id)  
-    
-    # Add system message if conversation is new
-    if not existing_messages:
-        existing_messages = [sys_msg]
-    
+
+    # Only the new message is submitted: the checkpointer already holds the
+    # thread, and model_input() trims it to max_tokens inside the graph
     new_message = {"role": "user", "content": query}
-    all_messages = existing_messages + [new_message]
+    config = {"configurable": {"thread_id": thread_id, "max_tokens": max_tokens}, "callbacks": [usage_tracker]}
+    user_id = user_id or thread_owner(thread_id)
+
+    # Semantic answer cache, only for the opening question of a thread
+    # (follow-ups depend on earlier turns and are never served from cache)
+    query_embedding = None
+    if ANSWER_CACHE_ENABLED and not await thread_exists(thread_id):
+        query_embedding = await embed_query(query)
+        cached = answer_cache.lookup(query_embedding)
+        if cached:
+            print(f"Answer cache hit ({cached['similarity']:.3f}): {cached['question']}")
+            stream = replay_cached_answer(graph, config, query, cached)
+            return index_thread_after(stream, thread_id, user_id, query)
+    
+    stream = answer_events(graph.astream({"messages": [new_message]}, config, stream_mode=["messages", "updates"]))
+    if query_embedding is not None:
+        stream = cache_answer_after(stream, query, query_embedding)
+    return index_thread_after(stream, thread_id, user_id, query)
+
+
+# Nodes whose model output is the answer the user sees (generate_query_or_respond
+# answers directly when it does not call the retriever)
+ANSWER_NODES = {"generate_query_or_respond", "generate_answer"}
+
+
+async def answer_events(stream):
+    """Reduce a graph.astream(stream_mode=["messages", "updates"]) run to answer events.
+
+    Yields:
+        {"type": "delta", "node", "text"}    answer tokens from ANSWER_NODES
+        {"type": "sources", "sources"}       retrieved chunks that passed grading
+        {"type": "update", "node", "messages"}  a node finished, with its message count
+
+    Tokens of rewrite_question, tool-call chunks and every other callback event
+    never leave the graph layer. Closing these events closes the graph run, as
+    do the other pass-through generators below.
+    """
 
-    # Final trim including new message
-    all_messages = trim_messages(all_messages, max_tokens)
-    
-    print(f"Running workflow with {len(all_messages)} messages...")
-    # print_trimmed_messages(all_messages)
+    async with contextlib.aclosing(stream):
+        async for mode, payload in stream:
+            if mode == "messages":
+                chunk, metadata = payload
+                node = metadata.get("langgraph_node")
+                if node in ANSWER_NODES and isinstance(chunk.content, str) and chunk.content:
+                    yield {"type": "delta", "node": node, "text": chunk.content}
+            elif mode == "updates":
+                for node, output in payload.items():
+                    messages = (output or {}).get("messages", []) if isinstance(output, dict) else []
+                    if node == "grade_documents" and output.get("relevant_documents"):
+                        yield {"type": "sources", "sources": output["relevant_documents"]}
+                    yield {"type": "update", "node": node, "messages": len(messages)}
+
+
+async def replay_cached_answer(graph, config, query: str, cached):
+    """Save the cached Q&A to the thread and stream the answer like a graph run."""
+
+    await graph.aupdate_state(
+        config,
+        {"messages": [{"role": "user", "content": query}, {"role": "assistant", "content": cached["answer"]}]},
+        as_node="generate_answer",
+    )
+    async for event in replay_answer_events(cached):
+        yield event
+
+
+async def cache_answer_after(stream, query: str, query_embedding):
+    """Pass the stream through and cache the answer if it came from retrieved articles."""
+
+    answer_parts = []
+    sources = None
+    async with contextlib.aclosing(stream):
+        async for event in stream:
+            if event["type"] == "sources":
+                sources = event["sources"]
+            elif event["type"] == "delta" and event["node"] == "generate_answer":
+                answer_parts.append(event["text"])
+            yield event
+
+    if answer_parts:
+        answer_cache.store(query, query_embedding, "".join(answer_parts), sources)
+
+
+async def index_thread_after(stream, thread_id: str, user_id: str, query: str):
+    """Pass the answer events through and update the thread index once the turn is done."""
+
+    added_messages = 1  # the user message
+    async with contextlib.aclosing(stream):
+        async for event in stream:
+            if event["type"] == "update":
+                added_messages += event["messages"]
+                continue
+            yield event
 
+    if user_id:
+        await update_thread_index(thread_id, user_id, query, added_messages)
+
+async def settle_cancelled_turn(thread_id: str, user_id: str = None):
+    """Leave the checkpoint of a cancelled run in a state the next turn can build on.
+
+    A cancelled run keeps its last completed step, including the user message.
+    An assistant tool call whose retrieval never finished is removed (the model
+    API rejects a tool call without its result) and the run is marked finished,
+    so the next message starts a fresh turn. The thread index is updated from
+    the final state, since index_thread_after never saw the end of the turn.
+    """
+
+    graph = await get_graph()
     config = {"configurable": {"thread_id": thread_id}}
-    
-    # Return async generator (stream)
-    return graph.astream_events({"messages": all_messages}, config, version="v1")    
+    state = await graph.aget_state(config)
+    messages = state.values.get("messages", [])
+    if not messages:
+        return
+
+    if state.next:
+        dangling = [RemoveMessage(id=msg.id) for msg in messages[-1:] if getattr(msg, "tool_calls", None)]
+        await graph.aupdate_state(config, {"messages": dangling}, as_node="generate_answer")
+        messages = messages[:len(messages) - len(dangling)]
+
+    user_id = user_id or thread_owner(thread_id)
+    if user_id:
+        try:
+            async with _pool.connection() as conn:
+                await record_thread_turn(
+                    conn, user_id, thread_id, make_title(first_human_message(messages)), len(messages)
+                )
+        except Exception as e:
+            print(f"Error updating thread index: {e}")
 
 def print_trimmed_messages(messages):
     for i, msg in enumerate(messages, 1):
@@ -392,6 +783,16 @@ async def get_full_conversation(thread_id: str):
 
 
 
+async def thread_exists(thread_id: str):
+    """Whether the thread has any checkpoint (without loading its messages)."""
+
+    if _pool is None:
+        await get_graph()
+    async with _pool.connection() as conn:
+        cur = await conn.execute("SELECT 1 FROM checkpoints WHERE thread_id = %s LIMIT 1", (thread_id,))
+        return await cur.fetchone() is not None
+
+
 async def show_full_conversation(thread_id: str):
     """Display the full conversation for a given thread."""
     messages = await get_full_conversation(thread_id)
@@ -409,89 +810,40 @@ async def show_full_conversation(thread_id: str):
 # ==============================================================================
 import asyncio
 
-async def get_all_thread_ids(user_id: str):
-   """Get all thread IDs with their first message as title (latest checkpoints only)."""
-   
-   print("get_all_thread_ids called")
-   
-   try:
-       global checkpointer
-       if checkpointer is None:
-           await get_graph()
-       
-       thread_data = []
-       seen_threads = set()
-       print("Starting checkpointer.alist...")
-       
-       # Add timeout to prevent hanging
-       try:
-           # Use asyncio.wait_for instead of asyncio.timeout for compatibility
-           async def get_checkpoints():
-               checkpoint_list = []
-               
-               async for checkpoint_tuple in checkpointer.alist({}):
-                   checkpoint_list.append(checkpoint_tuple)
-               return checkpoint_list
-           
-           checkpoints = await asyncio.wait_for(get_checkpoints(), timeout=15.0)
-           print(f"Retrieved {len(checkpoints)} checkpoints")
-           
-           for checkpoint_tuple in checkpoints:
-               thread_id = checkpoint_tuple.config.get("configurable", {}).get("thread_id")
-               # print(f"Processing thread_id: {thread_id}")
-
-               # Only include threads that belong to this user
-               if thread_id and thread_id.startswith(f"{user_id}_"):
-                   
-                   # Skip if we already processed this thread_id
-                   if thread_id and thread_id not in seen_threads:
-                       seen_threads.add(thread_id)
-                       
-                       # Get LATEST state for this thread_id (same as get_full_conversation)
-                       config = {"configurable": {"thread_id": thread_id}}  
-                       state_tuple = await checkpointer.aget_tuple(config)
-                       
-                       if state_tuple:
-                           channel_values = state_tuple.checkpoint.get("channel_values", {})
-                           messages = channel_values.get("messages", [])
-                           
-                           # Get first human message as title
-                           title = "New Chat"
-                           for msg in messages:
-                               try:
-                                   if hasattr(msg, 'type') and hasattr(msg, 'content'):
-                                       if msg.type == "human" and msg.content:
-                                           content = msg.content
-                                           title = content[:30] + "..." if len(content) > 30 else content
-                                           break
-                                   elif isinstance(msg, dict) and msg.get("type") == "human":
-                                       if msg.get("content"):
-                                           content = msg["content"]
-                                           title = content[:30] + "..." if len(content) > 30 else content
-                                           break
-                               except Exception as msg_error:
-                                   print(f"Error processing message: {msg_error}")
-                                   continue
-                           
-                           thread_data.append({
-                               "thread_id": thread_id,
-                               "title": title
-                           })
-                           #    print(f"Added thread: {thread_id} - {title}")
-       except asyncio.TimeoutError:
-           print("Timeout waiting for checkpointer.alist() - returning partial results")
-       except Exception as list_error:
-           print(f"Error in checkpointer.alist(): {list_error}")
-           return []
-       
-       #    print(f"Final thread_data: {thread_data}")
-            
-       print(f"Found {len(thread_data)} unique threads.")
-       return thread_data
-       
-   except Exception as e:
-       print(f"Error getting thread IDs: {e}")
-       import traceback
-       traceback.print_exc()
-       return []
+async def get_all_thread_ids(user_id: str, limit: int = 50, offset: int = 0):
+    """Get one page of a user's threads (latest first) from the thread index."""
+
+    print("get_all_thread_ids called")
+
+    global _pool
+    if _pool is None:
+        await get_graph()
+
+    async with _pool.connection() as conn:
+        rows = await list_threads(conn, user_id, limit=limit, offset=offset)
+    print(f"Found {len(rows)} threads.")
+    return rows
+
+
+async def update_thread_index(thread_id: str, user_id: str, query: str, added_messages: int):
+    """Record a finished turn in the thread index (message_count grows by added_messages)."""
+
+    try:
+        async with _pool.connection() as conn:
+            await record_thread_turn(conn, user_id, thread_id, make_title(query), added_messages, increment=True)
+    except Exception as e:
+        print(f"Error updating thread index: {e}")
+
+
+async def rebuild_thread_index():
+    """Index threads that were created before the thread index existed."""
+
+    global checkpointer
+    if checkpointer is None:
+        await get_graph()
+    try:
+        async with _pool.connection() as conn:
+            await backfill_thread_index(conn, checkpointer)
+    except Exception as e:
+        print(f"Error backfilling thread index: {e}")
 # ==========================================================================
\ No newline at end of file
@@ -0,0 +1,107 @@
+from bisect import bisect_left
+from collections import OrderedDict
+
+from token_counter import count_message_tokens, message_key, TOKENS_PER_REPLY
+
+
+# ===============================================================================
+# Sliding-window trimming with per-thread prefix sums
+
+class MessageTrimmer:
+    """Trim conversations to a token budget using cached running totals.
+
+    For every thread it keeps a prefix sum of the token counts seen so far,
+    with the keys of the first and last messages it covers. A new turn only
+    counts the messages appended since the previous call, and the cut point
+    is found by binary search.
+    """
+
+    def __init__(self, max_threads=1000):
+        self.max_threads = max_threads
+        self._threads = OrderedDict()
+
+    def _prefix_sums(self, messages, thread_id):
+        """Return the prefix sums for messages, reusing the thread's cached ones."""
+
+        first_key, last_key, sums = None, None, [0]
+        if thread_id is not None and thread_id in self._threads:
+            first_key, last_key, sums = self._threads.pop(thread_id)
+
+        # Threads only grow, so the cached sums still hold if the messages at
+        # both ends of the cached prefix are unchanged; otherwise start over
+        cached = len(sums) - 1
+        if not cached or cached > len(messages) or message_key(messages[0]) != first_key \
+                or message_key(messages[cached - 1]) != last_key:
+            sums = [0]
+
+        for msg in messages[len(sums) - 1:]:
+            sums.append(sums[-1] + count_message_tokens(msg))
+
+        if thread_id is not None and len(sums) > 1:
+            self._threads[thread_id] = (message_key(messages[0]), message_key(messages[-1]), sums)
+            if len(self._threads) > self.max_threads:
+                self._threads.popitem(last=False)
+        return sums
+
+    def trim(self, messages, max_tokens, thread_id=None):
+        """Keep the system prompt, first user message and latest turns within max_tokens.
+
+        The window always starts on a user message, so a tool result is never
+        kept without the assistant tool call before it. The current turn (the
+        last user message and everything after it) is always kept.
+        """
+
+        if not messages or len(messages) <= 2:
+            return messages
+
+        sums = self._prefix_sums(messages, thread_id)
+        total = sums[-1] + TOKENS_PER_REPLY
+        if total <= max_tokens:
+            print(f"Current token count ({total}) is within the limit ({max_tokens}). No trimming needed.")
+            return messages
+
+        # Pinned head: system prompt (if any) and the original user query
+        head_len = 2 if _role(messages[0]) == "system" else 1
+        # Pinned tail: the current turn, from the latest user message on
+        tail_start = len(messages)
+        while tail_start > head_len and _role(messages[tail_start - 1]) != "human":
+            tail_start -= 1
+        tail_start = max(head_len, tail_start - 1)
+
+        fixed = sums[head_len] + (sums[-1] - sums[tail_start]) + TOKENS_PER_REPLY
+        budget = max_tokens - fixed
+
+        # Smallest start index whose middle slice [start, tail_start) fits the budget,
+        # moved forward to the next turn boundary
+        start = tail_start
+        if budget > 0:
+            start = bisect_left(sums, sums[tail_start] - budget, head_len, tail_start + 1)
+            while start < tail_start and _role(messages[start]) != "human":
+                start += 1
+
+        head = messages[:head_len]
+        head_tokens = sums[head_len]
+        if budget < 0 and head_len < tail_start:
+            # The first user message is only pinned while it fits; the system
+            # prompt and the current turn are always sent
+            head = [msg for msg in head if _role(msg) == "system"]
+            head_tokens = sums[1] if head else 0
+
+        trimmed = head + messages[start:]
+        final_tokens = head_tokens + sums[-1] - sums[start] + TOKENS_PER_REPLY
+        if final_tokens > max_tokens:
+            print(f"Warning: the system prompt and current turn alone take {final_tokens} tokens, "
+                  f"over the limit ({max_tokens})")
+        print(f"Token limit exceeded ({total} > {max_tokens}). "
+              f"Trimmed to {len(trimmed)} messages ({final_tokens} tokens)")
+        return trimmed
+
+    def forget(self, thread_id):
+        """Drop the cached running totals of a thread."""
+
+        self._threads.pop(thread_id, None)
+
+
+def _role(msg):
+    role = msg.get("role") if isinstance(msg, dict) else getattr(msg, 'type', None)
+    return {"user": "human", "assistant": "ai"}.get(role, role)
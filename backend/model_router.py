@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_openai import ChatOpenAI
+
+
+# ===============================================================================
+# Model routing and per-node cost accounting
+#
+# Each graph role gets its own model, configurable per environment:
+#   RESPONSE_MODEL  generate_query_or_respond and generate_answer
+#   GRADE_MODEL     grade_documents (a yes/no decision)
+#   REWRITE_MODEL   rewrite_question
+# UsageTracker is attached to every run as a callback and records latency of
+# each graph step plus the tokens and estimated cost of each model call, keyed
+# by the node it ran in.
+
+MODEL_DEFAULTS = {
+    "response": "gpt-4.1",
+    "grade": "gpt-4.1-mini",
+    "rewrite": "gpt-4.1-mini",
+}
+
+# USD per 1M tokens (input, output)
+MODEL_PRICES = {
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+# Graph steps timed by UsageTracker
+TRACKED_STEPS = ("generate_query_or_respond", "retrieve", "grade_documents", "rewrite_question", "generate_answer")
+
+
+class ModelRouter:
+    def __init__(self, defaults=MODEL_DEFAULTS):
+        self.models = {role: os.getenv(f"{role.upper()}_MODEL", model) for role, model in defaults.items()}
+
+    def chat_model(self, role, **kwargs):
+        return ChatOpenAI(model=self.models[role], temperature=0, **kwargs)
+
+
+def model_cost(model, input_tokens, output_tokens):
+    # Dated snapshots ("gpt-4.1-mini-2025-04-14") are priced like their family
+    family = max((name for name in MODEL_PRICES if model and model.startswith(name)), key=len, default=None)
+    if family is None:
+        return 0.0
+    input_price, output_price = MODEL_PRICES[family]
+    return (input_tokens * input_price + output_tokens * output_price) / 1e6
+
+
+class UsageTracker(BaseCallbackHandler):
+    """Per-node latency, model calls, tokens and cost, plus counters set by the nodes."""
+
+    run_inline = True  # only bookkeeping, no I/O
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = {}
+        self.nodes = {}
+
+    def _node(self, name):
+        return self.nodes.setdefault(name, {
+            "runs": 0, "total_ms": 0.0, "max_ms": 0.0,
+            "model_calls": 0, "model_ms": 0.0,
+            "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0,
+            "counters": {},
+        })
+
+    def count(self, node, counter, amount=1):
+        with self._lock:
+            counters = self._node(node)["counters"]
+            counters[counter] = counters.get(counter, 0) + amount
+
+    # ---- graph steps ----
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        if kwargs.get("name") in TRACKED_STEPS:
+            self._started[run_id] = (kwargs["name"], time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started:
+            name, start = started
+            elapsed = (time.perf_counter() - start) * 1000
+            with self._lock:
+                node = self._node(name)
+                node["runs"] += 1
+                node["total_ms"] += elapsed
+                node["max_ms"] = max(node["max_ms"], elapsed)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
+
+    # ---- model calls ----
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        metadata = metadata or {}
+        model = (kwargs.get("invocation_params") or {}).get("model") or metadata.get("ls_model_name")
+        node = metadata.get("langgraph_node", "other")
+        self._started[run_id] = (node, model, time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if not started:
+            return
+        node, model, start = started
+        input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+        with self._lock:
+            entry = self._node(node)
+            entry["model_calls"] += 1
+            entry["model_ms"] += (time.perf_counter() - start) * 1000
+            entry["input_tokens"] += input_tokens
+            entry["output_tokens"] += output_tokens
+            entry["cost_usd"] += model_cost(model, input_tokens, output_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                name: {
+                    **{key: value for key, value in node.items() if key != "counters"},
+                    "avg_ms": node["total_ms"] / node["runs"] if node["runs"] else 0.0,
+                    "counters": dict(node["counters"]),
+                }
+                for name, node in self.nodes.items()
+            }
@@ -30,4 +30,14 @@ GENERATE_PROMPT = (
 sys_msg = {"role": "system", "content": "You are a helpful AI assistant. Never use your context for news always use tools for news (global affairs, international relations, international affairs) to get the data and article link."
     "Format sources as: Source: [link]"        
     "If you don't know the answer, just say I don't know."
-""}
\ No newline at end of file
+""}
+
+
+def system_message(today: str) -> dict:
+    """sys_msg with today's date (YYYY-MM-DD), so relative dates map to tool date filters."""
+
+    return {
+        "role": "system",
+        "content": sys_msg["content"] + f"\nToday's date is {today}; use it to resolve relative dates "
+        "such as \"last week\" or \"this year\" into start_date/end_date.",
+    }
@@ -0,0 +1,78 @@
+import os
+import re
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+from embeddings.bm25_index import tokenize
+
+
+# ===============================================================================
+# Relevance grading helpers
+#
+# GRADER_MODE=llm     every grade is a (small, structured-output) model call
+# GRADER_MODE=hybrid  clear cases are decided offline and skip the model:
+#   "yes" when the documents cover enough of the question's terms or the best
+#         dense-retrieval similarity is high,
+#   "no"  when nothing was retrieved, or no question term appears and the
+#         similarity is low;
+#   everything in between still goes to the model.
+
+GRADER_MODE = os.getenv("GRADER_MODE", "llm")
+GRADE_LEXICAL_YES = float(os.getenv("GRADE_LEXICAL_YES", "0.6"))
+GRADE_LEXICAL_NO = float(os.getenv("GRADE_LEXICAL_NO", "0.0"))
+GRADE_SIMILARITY_YES = float(os.getenv("GRADE_SIMILARITY_YES", "0.5"))
+GRADE_SIMILARITY_NO = float(os.getenv("GRADE_SIMILARITY_NO", "0.25"))
+
+# Question words that say nothing about the topic, on top of the BM25 stopwords
+QUESTION_STOPWORDS = {
+    "any", "are", "can", "give", "me", "please", "tell", "there", "where", "why", "you", "your",
+}
+
+
+class RelevanceGrade(BaseModel):
+    """Binary relevance score for retrieved documents."""
+
+    binary_score: Literal["yes", "no"] = Field(description="'yes' if the documents are relevant to the question, else 'no'")
+
+
+def parse_grade(response):
+    """'yes' or 'no' from a structured grade or a plain-text reply (first word only)."""
+
+    score = getattr(response, "binary_score", None)
+    if score is None:
+        match = re.match(r"\W*(yes|no)\b", getattr(response, "content", "") or "", re.IGNORECASE)
+        score = match.group(1).lower() if match else "no"
+    return score
+
+
+def content_terms(text):
+    """Terms that carry meaning: no stopwords and no one-letter tokens ("s" of "India's")."""
+
+    return {term for term in tokenize(text) if len(term) > 1 and term not in QUESTION_STOPWORDS}
+
+
+def lexical_coverage(question, text):
+    """Share of the question's terms that appear in the text (None for an empty question)."""
+
+    terms = content_terms(question)
+    if not terms:
+        return None
+    return len(terms & content_terms(text)) / len(terms)
+
+
+def offline_grade(question, documents):
+    """'yes'/'no' when term overlap or retrieval similarity make it clear, else None."""
+
+    if not documents:
+        return "no"
+    coverage = lexical_coverage(question, " ".join(doc.get("snippet", "") for doc in documents))
+    similarities = [doc["similarity"] for doc in documents if doc.get("similarity") is not None]
+    similarity = max(similarities) if similarities else None
+
+    if (coverage is not None and coverage >= GRADE_LEXICAL_YES) or (
+            similarity is not None and similarity >= GRADE_SIMILARITY_YES):
+        return "yes"
+    if coverage is not None and coverage <= GRADE_LEXICAL_NO and (similarity is None or similarity < GRADE_SIMILARITY_NO):
+        return "no"
+    return None
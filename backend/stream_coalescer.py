@@ -0,0 +1,75 @@
+import asyncio
+import contextlib
+import os
+
+
+# ===============================================================================
+# Token coalescing for the WebSocket stream
+#
+# Sending every model token as its own frame costs a send (and a JSON encode)
+# per token. Deltas are buffered instead and sent as one frame when
+#   - COALESCE_WINDOW has passed since the first buffered token, or
+#   - the buffer reaches COALESCE_BYTES, or
+#   - any other event (sources, end of stream) has to go out after it.
+# The window bounds the extra latency a token can pick up.
+
+COALESCE_WINDOW = float(os.getenv("STREAM_COALESCE_MS", "20")) / 1000
+COALESCE_BYTES = int(os.getenv("STREAM_COALESCE_BYTES", "64"))
+
+
+async def coalesce_deltas(events, window=COALESCE_WINDOW, max_bytes=COALESCE_BYTES):
+    """Merge consecutive {"type": "delta", "text"} events into larger delta events.
+
+    Other events are passed through unchanged, after any buffered text.
+    """
+
+    loop = asyncio.get_running_loop()
+    iterator = events.__aiter__()
+    buffer, size, deadline = [], 0, None
+
+    def flush():
+        nonlocal buffer, size, deadline
+        frame = {"type": "delta", "text": "".join(buffer)}
+        buffer, size, deadline = [], 0, None
+        return frame
+
+    # The next event is awaited in a task so the window can close while the
+    # model is still working on the following token
+    pending = asyncio.ensure_future(iterator.__anext__())
+    try:
+        while True:
+            timeout = None if deadline is None else max(deadline - loop.time(), 0)
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                yield flush()
+                continue
+            try:
+                event = pending.result()
+            except StopAsyncIteration:
+                break
+            pending = asyncio.ensure_future(iterator.__anext__())
+
+            if event["type"] != "delta":
+                if buffer:
+                    yield flush()
+                yield event
+                continue
+
+            buffer.append(event["text"])
+            size += len(event["text"].encode("utf-8"))
+            if deadline is None:
+                deadline = loop.time() + window
+            if size >= max_bytes or loop.time() >= deadline:
+                yield flush()
+    finally:
+        # Closing the frames (e.g. a cancelled turn) cancels the run behind them
+        # and waits for it, so nothing keeps writing once the caller moves on
+        if not pending.done():
+            pending.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await pending
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
+
+    if buffer:
+        yield flush()
@@ -0,0 +1,105 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# graph builds its clients on import; keep them local and offline
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("VECTOR_STORE", "local")
+os.environ.setdefault("LOCAL_INDEX_DIR", tempfile.mkdtemp())
+os.environ.setdefault("ANSWER_CACHE_ENABLED", "false")
+os.environ.setdefault("HYBRID_RETRIEVAL", "false")
+
+from langchain_core.messages import AIMessage  # noqa: E402
+from langgraph.checkpoint.memory import InMemorySaver  # noqa: E402
+
+import graph  # noqa: E402
+
+LATENCY = 0.1
+CHATS = 8
+
+
+def content(msg):
+    return msg.get("content", "") if isinstance(msg, dict) else msg.content
+
+
+class FakeChatModel:
+    """Asks for retrieval when tools are bound, otherwise replies (or echoes the prompt)."""
+
+    def __init__(self, reply=None, calls_tool=False):
+        self.reply = reply
+        self.calls_tool = calls_tool
+
+    def bind_tools(self, tools):
+        return FakeChatModel(self.reply, calls_tool=True)
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(LATENCY)
+        last = messages[-1]
+        last_type = last.get("role") if isinstance(last, dict) else last.type
+        if self.calls_tool and last_type in ("user", "human"):
+            return AIMessage(content="", tool_calls=[
+                {"name": "retriever_tool", "args": {"query": content(last)}, "id": "call_1"}
+            ])
+        return AIMessage(content=self.reply or f"Answer to: {content(last)}")
+
+
+class FakeEmbeddings:
+    async def create(self, model, input):
+        await asyncio.sleep(LATENCY)
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[1.0] * 1536)])
+
+
+class FakeIndex:
+    def query(self, vector, top_k, include_metadata, **kwargs):
+        time.sleep(LATENCY)  # blocks its thread, like the sync Pinecone client
+        return {"matches": [
+            {"id": str(i), "score": 0.9, "metadata": {"url": f"https://www.reuters.com/world/{i}", "text": "text"}}
+            for i in range(top_k)
+        ]}
+
+
+def compile_app(monkeypatch):
+    monkeypatch.setattr(graph, "client", SimpleNamespace(embeddings=FakeEmbeddings()))
+    monkeypatch.setattr(graph, "index", FakeIndex())
+    monkeypatch.setattr(graph, "response_model", FakeChatModel())
+    monkeypatch.setattr(graph, "grader_model", FakeChatModel(reply="yes"))
+    monkeypatch.setattr(graph, "embedding_cache", graph.EmbeddingCache())
+    return graph.workflow.compile(checkpointer=InMemorySaver())
+
+
+async def ask(app, thread_id, question):
+    config = {"configurable": {"thread_id": thread_id}}
+    await app.ainvoke({"messages": [{"role": "user", "content": question}]}, config)
+    return (await app.aget_state(config)).values["messages"]
+
+
+def test_parallel_chats_keep_their_own_threads(monkeypatch):
+    app = compile_app(monkeypatch)
+    questions = [f"What happened to topic{i:02d}?" for i in range(CHATS)]
+
+    async def run():
+        single_start = time.perf_counter()
+        await ask(app, "warmup", "What happened to warmup?")
+        single = time.perf_counter() - single_start
+
+        start = time.perf_counter()
+        threads = await asyncio.gather(*[ask(app, f"thread-{i}", q) for i, q in enumerate(questions)])
+        return single, time.perf_counter() - start, threads
+
+    single, parallel, threads = asyncio.run(run())
+
+    for i, messages in enumerate(threads):
+        topic = f"topic{i:02d}"
+        others = [f"topic{j:02d}" for j in range(CHATS) if j != i]
+        text = " ".join(content(msg) for msg in messages)
+        assert content(messages[0]) == questions[i]
+        assert topic in content(messages[-1])
+        assert not any(other in text for other in others)
+
+    # Nodes await their I/O, so the chats overlap instead of running one after another
+    assert parallel < single * CHATS / 2
@@ -0,0 +1,65 @@
+import importlib.util
+import os
+import sys
+
+EMBEDDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "embeddings")
+sys.path.insert(0, EMBEDDINGS_DIR)
+
+from bm25_index import BM25Index  # noqa: E402
+from dedup import DedupReport, find_duplicate_articles  # noqa: E402
+from manifest import IngestManifest  # noqa: E402
+
+# The ingest script shares its name with the embeddings package, so load it by path
+_spec = importlib.util.spec_from_file_location("ingest_embeddings", os.path.join(EMBEDDINGS_DIR, "embeddings.py"))
+ingest_script = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(ingest_script)
+chunk_article = ingest_script.chunk_article
+drop_duplicate_articles = ingest_script.drop_duplicate_articles
+iter_chunks_to_embed = ingest_script.iter_chunks_to_embed
+
+URL = "https://www.reuters.com/world/asia-pacific/india-monsoon-rains-2025-07-01/"
+
+
+def story(update=""):
+    paragraphs = [
+        f"Paragraph {i} of the monsoon story: rainfall in district {i} was {10 + i} percent above "
+        f"the long-term average, officials said, as farmers in region {i} planted rice, cotton and "
+        f"soybeans earlier than usual. Reservoir levels in state {i} rose for a {i}th straight week, "
+        f"easing concerns about drinking water, power generation and food inflation. Traders in "
+        f"market {i} expect prices of pulses and vegetables to ease by the end of the quarter."
+        for i in range(8)
+    ]
+    return " ".join(paragraphs) + update
+
+
+def ingest(articles, manifest, bm25, dropped_urls=()):
+    duplicates = find_duplicate_articles(articles)
+    report = DedupReport(duplicate_articles=len(duplicates))
+    to_delete = []
+    embedded = list(iter_chunks_to_embed(
+        drop_duplicate_articles(articles, duplicates, report), manifest, bm25, False, to_delete, report,
+        set(duplicates) | set(dropped_urls),
+    ))
+    return embedded, to_delete
+
+
+def test_updated_article_replaces_the_old_version(tmp_path):
+    manifest = IngestManifest(str(tmp_path / "manifest.json"))
+    bm25 = BM25Index()
+    original = {"title": "Monsoon", "publication_date": "2025-07-01T08:00:00", "url": URL, "full_text": story()}
+
+    embedded, to_delete = ingest([original], manifest, bm25)
+    old_ids = {item["id"] for item in embedded}
+    assert len(old_ids) == 8 and not to_delete
+
+    updated = {
+        "title": "Monsoon (updated)", "publication_date": "2025-07-01T14:00:00", "url": URL + "?id=updated",
+        "full_text": story(" Updated with comments from the weather office."),
+    }
+    embedded, to_delete = ingest([original, updated], manifest, bm25)
+
+    assert {item["metadata"]["url"] for item in embedded} == {updated["url"]}
+    assert len(embedded) == len(chunk_article(updated))
+    assert set(to_delete) == old_ids
+    assert set(manifest.articles) == {updated["url"]}
+    assert len(manifest.chunk_ids(updated["url"])) == len(embedded)
@@ -0,0 +1,22 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from relevance_grader import lexical_coverage, offline_grade  # noqa: E402
+
+
+def test_possessive_s_is_not_an_overlap():
+    question = "What's Brazil's plan for the Amazon?"
+    snippet = "India's central bank kept rates on hold as inflation eased, the RBI's governor said."
+
+    assert lexical_coverage(question, snippet) == 0.0
+    assert offline_grade(question, [{"snippet": snippet, "similarity": 0.1}]) == "no"
+
+
+def test_coverage_counts_content_terms():
+    question = "What's Brazil's plan for the Amazon?"
+    snippet = "Brazil's government unveiled a plan to curb deforestation in the Amazon."
+
+    assert lexical_coverage(question, snippet) == 1.0
+    assert offline_grade(question, [{"snippet": snippet}]) == "yes"
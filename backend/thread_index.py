@@ -0,0 +1,138 @@
+# ===============================================================================
+# Per-user chat thread index
+#
+# One row per thread, kept up to date at the end of every turn, so listing a
+# user's chats is a single indexed query instead of a scan over all checkpoints.
+
+TITLE_LENGTH = 30
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS chat_threads (
+    thread_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    message_count INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+CREATE_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS chat_threads_user_updated_idx
+    ON chat_threads (user_id, updated_at DESC)
+"""
+
+UPSERT_SQL = """
+INSERT INTO chat_threads (thread_id, user_id, title, message_count, created_at, updated_at)
+VALUES (%(thread_id)s, %(user_id)s, %(title)s, %(message_count)s,
+        COALESCE(%(updated_at)s::timestamptz, now()), COALESCE(%(updated_at)s::timestamptz, now()))
+ON CONFLICT (thread_id) DO UPDATE
+    SET updated_at = EXCLUDED.updated_at,
+        message_count = EXCLUDED.message_count
+"""
+
+# Live turns add to the count instead of re-reading the whole thread
+INCREMENT_SQL = """
+INSERT INTO chat_threads (thread_id, user_id, title, message_count)
+VALUES (%(thread_id)s, %(user_id)s, %(title)s, %(message_count)s)
+ON CONFLICT (thread_id) DO UPDATE
+    SET updated_at = now(),
+        message_count = chat_threads.message_count + EXCLUDED.message_count
+"""
+
+LIST_SQL = """
+SELECT thread_id, title, created_at, updated_at, message_count
+FROM chat_threads
+WHERE user_id = %(user_id)s
+ORDER BY updated_at DESC
+LIMIT %(limit)s OFFSET %(offset)s
+"""
+
+
+def make_title(text):
+    """Chat title from the first user message."""
+
+    if not text:
+        return "New Chat"
+    return text[:TITLE_LENGTH] + "..." if len(text) > TITLE_LENGTH else text
+
+
+def thread_owner(thread_id):
+    """User id encoded in a "{user_id}_..." thread id, if any."""
+
+    if thread_id and "_" in thread_id:
+        return thread_id.split("_", 1)[0]
+    return None
+
+
+async def setup_thread_index(conn):
+    """Create the thread index table. Returns True if it did not exist before."""
+
+    cur = await conn.execute("SELECT to_regclass('chat_threads') IS NULL AS missing")
+    row = await cur.fetchone()
+    await conn.execute(CREATE_TABLE_SQL)
+    await conn.execute(CREATE_INDEX_SQL)
+    return bool(row["missing"])
+
+
+async def record_thread_turn(conn, user_id, thread_id, title, message_count, updated_at=None, increment=False):
+    """Insert or refresh a thread's row after a finished turn (updated_at defaults to now).
+
+    With increment, message_count is the number of messages the turn added.
+    """
+
+    await conn.execute(INCREMENT_SQL if increment else UPSERT_SQL, {
+        "thread_id": thread_id,
+        "user_id": user_id,
+        "title": title,
+        "message_count": message_count,
+        "updated_at": updated_at,
+    })
+
+
+async def list_threads(conn, user_id, limit=50, offset=0):
+    """Most recently updated threads of a user, one page at a time."""
+
+    cur = await conn.execute(LIST_SQL, {"user_id": user_id, "limit": limit, "offset": offset})
+    return await cur.fetchall()
+
+
+def first_human_message(messages):
+    for msg in messages:
+        if isinstance(msg, dict):
+            if msg.get("type") == "human" or msg.get("role") == "user":
+                if msg.get("content"):
+                    return msg["content"]
+        elif getattr(msg, "type", None) == "human" and getattr(msg, "content", None):
+            return msg.content
+    return None
+
+
+async def backfill_thread_index(conn, checkpointer):
+    """One-off migration: index threads that only exist as checkpoints.
+
+    Checkpoints are listed newest first, so the first one seen per thread is
+    its latest state.
+    """
+
+    seen_threads = set()
+    async for checkpoint_tuple in checkpointer.alist({}):
+        thread_id = checkpoint_tuple.config.get("configurable", {}).get("thread_id")
+        if not thread_id or thread_id in seen_threads:
+            continue
+        seen_threads.add(thread_id)
+
+        user_id = thread_owner(thread_id)
+        if not user_id:
+            continue
+
+        messages = checkpoint_tuple.checkpoint.get("channel_values", {}).get("messages", [])
+        await record_thread_turn(
+            conn, user_id, thread_id,
+            make_title(first_human_message(messages)),
+            len(messages),
+            updated_at=checkpoint_tuple.checkpoint.get("ts"),
+        )
+
+    print(f"Thread index backfilled with {len(seen_threads)} threads.")
+    return len(seen_threads)
@@ -0,0 +1,159 @@
+import hashlib
+import os
+import sys
+import time
+from collections import OrderedDict
+
+import tiktoken
+
+
+# ===============================================================================
+# Offline token counting with a per-message cache
+
+# Same accounting OpenAI uses for chat models: every message carries a few
+# framing tokens and every reply is primed with a few more.
+TOKEN_MODEL = "gpt-4o"
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+# Upper bound on cached per-message counts (oldest entries are evicted first)
+MAX_CACHED_MESSAGES = 50000
+
+# tiktoken downloads its BPE files on first use and caches them here; run
+# `python token_counter.py download` once (at deploy time) to count offline
+TOKENIZER_CACHE_DIR = os.environ.setdefault(
+    "TIKTOKEN_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "tiktoken")
+)
+
+# Without the tokenizer, counts are estimated from the text length and
+# loading is retried after a while
+CHARS_PER_TOKEN = 4
+ENCODING_RETRY_SECONDS = 300
+
+_encoding = None
+_encoding_retry_at = 0.0
+_token_cache = OrderedDict()
+
+
+class CharEstimateEncoding:
+    """Stand-in for the tokenizer: about CHARS_PER_TOKEN characters per token."""
+
+    name = "char-estimate"
+
+    def encode(self, text):
+        return range((len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+
+def load_encoding():
+    try:
+        return tiktoken.encoding_for_model(TOKEN_MODEL)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def get_encoding():
+    """Load the tokenizer for TOKEN_MODEL once and reuse it (an estimate until it loads)."""
+
+    global _encoding, _encoding_retry_at
+
+    if _encoding is None or (isinstance(_encoding, CharEstimateEncoding) and time.time() >= _encoding_retry_at):
+        try:
+            encoding = load_encoding()
+        except Exception as e:
+            if _encoding is None:
+                print(f"Could not load the tokenizer ({e}); estimating tokens from text length")
+            _encoding = CharEstimateEncoding()
+            _encoding_retry_at = time.time() + ENCODING_RETRY_SECONDS
+        else:
+            if _encoding is not None:
+                _token_cache.clear()  # drop the estimates
+            _encoding = encoding
+    return _encoding
+
+
+def to_openai_message(msg):
+    """Convert a dict or LangChain message to an OpenAI (role, content) pair.
+
+    Returns None for messages that would not be sent to the model.
+    """
+
+    role = msg.get("role") if isinstance(msg, dict) else getattr(msg, 'type', 'unknown')
+    content = msg.get("content") if isinstance(msg, dict) else getattr(msg, 'content', '')
+
+    # Convert LangChain roles to OpenAI roles
+    if role == "human":
+        role = "user"
+    elif role == "ai":
+        role = "assistant"
+    elif role == "tool":
+        # convert tool messages to user message for token counting
+        role = "user"
+        content = f"Tool result: {content}"
+
+    # Only count messages with valid content
+    if content and role in ["user", "assistant", "system"]:
+        return role, str(content)
+    return None
+
+
+def message_key(msg):
+    """Cache key for a message: its id when it has one, otherwise a content hash."""
+
+    msg_id = msg.get("id") if isinstance(msg, dict) else getattr(msg, 'id', None)
+    if msg_id:
+        return msg_id
+
+    converted = to_openai_message(msg)
+    if converted is None:
+        return None
+    role, content = converted
+    return hashlib.sha1(f"{role}\x00{content}".encode("utf-8")).hexdigest()
+
+
+def count_message_tokens(msg, key=None):
+    """Count tokens of a single message, memoized by message id/content hash."""
+
+    if key is None:
+        key = message_key(msg)
+    if key is None:
+        return 0
+
+    cached = _token_cache.get(key)
+    if cached is not None:
+        _token_cache.move_to_end(key)
+        return cached
+
+    converted = to_openai_message(msg)
+    if converted is None:
+        tokens = 0
+    else:
+        role, content = converted
+        encoding = get_encoding()
+        tokens = TOKENS_PER_MESSAGE + len(encoding.encode(role)) + len(encoding.encode(content))
+
+    _token_cache[key] = tokens
+    if len(_token_cache) > MAX_CACHED_MESSAGES:
+        _token_cache.popitem(last=False)
+    return tokens
+
+
+def count_tokens(messages):
+    """Count prompt tokens for a list of messages without calling the API."""
+
+    if not messages:
+        return 0
+    return sum(count_message_tokens(msg) for msg in messages) + TOKENS_PER_REPLY
+
+
+def clear_token_cache():
+    """Drop all memoized per-message counts."""
+
+    _token_cache.clear()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] != ["download"]:
+        print("usage: python token_counter.py download")
+        sys.exit(1)
+    encoding = load_encoding()
+    print(f"Tokenizer {encoding.name} cached in {TOKENIZER_CACHE_DIR}")
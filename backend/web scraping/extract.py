@@ -0,0 +1,74 @@
+import argparse
+import os
+import sys
+from multiprocessing import Pool
+
+from newspaper import Article
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "embeddings"))
+from article_store import DEFAULT_ARTICLES_PATH, append_articles, iter_articles
+from html_archive import DEFAULT_ARCHIVE_DIR, HtmlArchive, read_object
+
+
+# --- Turn raw HTML into an article record (one parse per document) ---
+def extract_article(target_url, html):
+    ## Insert HTML into the Newspaper3k article object and parse the article;
+    ## article.text comes from the same parse, so fulltext() is not needed
+    article = Article(target_url)
+    article.download(html)
+    article.parse()
+
+    # Convert datetime to string if not None
+    publication_date = (
+        article.publish_date.isoformat() if article.publish_date else None
+    )
+
+    # Structured data
+    return {
+        "title": article.title,
+        "publication_date": publication_date,
+        "url": target_url,
+        "full_text": " ".join(article.text.split())
+    }
+
+
+def _reextract(job):
+    article, object_path = job
+    if object_path is None:
+        return article, False  # no archived HTML (e.g. migrated articles): keep as is
+    try:
+        return extract_article(article["url"], read_object(object_path)), True
+    except Exception as e:
+        print(f"Error re-extracting {article['url']}: {e}")
+        return article, False
+
+
+def reextract_store(archive, path=DEFAULT_ARTICLES_PATH, processes=None):
+    """Rebuild the article store from archived HTML across all cores, offline."""
+
+    jobs = ((article, archive.path_for(article["url"])) for article in iter_articles(path))
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    counts = {"reextracted": 0, "kept": 0}
+
+    def results(pool):
+        for article, reextracted in pool.imap(_reextract, jobs, chunksize=8):
+            counts["reextracted" if reextracted else "kept"] += 1
+            yield article
+
+    with Pool(processes) as pool:
+        append_articles(results(pool), tmp_path)
+    os.replace(tmp_path, path)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-extract every archived article without touching the network")
+    parser.add_argument("--archive", default=DEFAULT_ARCHIVE_DIR)
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    counts = reextract_store(HtmlArchive(args.archive), processes=args.processes)
+    print(f"Re-extracted {counts['reextracted']} articles, kept {counts['kept']} without archived HTML")
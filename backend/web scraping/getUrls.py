@@ -1,73 +1,126 @@
-import requests
-from bs4 import BeautifulSoup
-import re
-from datetime import datetime, timedelta
-import calendar
+import argparse
+import asyncio
 import os
-import time
+import re
+from datetime import date, datetime, timedelta
 
-API_KEY = ""
+import httpx
+from bs4 import BeautifulSoup
 
-# Step 1: Get previous month/year
-today = datetime.now()
-first_day_this_month = today.replace(day=1)
-last_month_date = first_day_this_month - timedelta(days=1)
-year = last_month_date.year
-month = last_month_date.month
+API_KEY = ""
+URLS_FILE = "urls.txt"
+MAX_PAGES = 20  # sitemap pages per day
+MAX_CONCURRENCY = int(os.getenv("SITEMAP_CONCURRENCY", "8"))
+MAX_ATTEMPTS = 4  # per sitemap page; waits 1, 2, 4 s between attempts
+RETRY_STATUSES = {429, 500, 502, 503, 504}
 
-# Step 2: Regex for date in format YYYY-MM-DD
+# Regex for date in format YYYY-MM-DD
 date_pattern = re.compile(r"\d{4}-\d{2}-\d{2}")
 
-# Step 3: Get number of days in that month
-days_in_month = calendar.monthrange(year, month)[1]
 
-# Step 4: Output file (overwrite)
-with open("urls.txt", "w", encoding="utf-8") as f:
-    pass  # Clear file
+# --- Default range: the whole previous month ---
+def previous_month():
+    first_day_this_month = datetime.now().date().replace(day=1)
+    last_day = first_day_this_month - timedelta(days=1)
+    return last_day.replace(day=1), last_day
 
-# Step 5: Loop days & pages
-for day in range(1, days_in_month + 1):
-    for page in range(1, 21):  # 1 → 20
-        sitemap_url = f"https://www.reuters.com/sitemap/{year}-{month:02d}/{day:02d}/{page}/"
-        print(f"Fetching: {sitemap_url}")
 
-        payload = {"api_key": API_KEY, "url": sitemap_url}
-        try:
-            resp = requests.get("https://api.scraperapi.com/", params=payload, timeout=30)
-            if resp.status_code != 200:
-                print(f"Skipping {sitemap_url} (status {resp.status_code})")
-                continue
+def parse_args():
+    start, end = previous_month()
+    parser = argparse.ArgumentParser(description="Collect Reuters world-news URLs from the daily sitemaps")
+    parser.add_argument("--start", type=date.fromisoformat, default=start, help="first day, YYYY-MM-DD")
+    parser.add_argument("--end", type=date.fromisoformat, default=end, help="last day (inclusive), YYYY-MM-DD")
+    parser.add_argument("--output", default=URLS_FILE)
+    return parser.parse_args()
 
-            soup = BeautifulSoup(resp.text, "html.parser")
-            links = [a["href"] for a in soup.find_all("a", href=True)]
 
-            filtered_links = [
-                "https://www.reuters.com" + link if link.startswith("/") else link
-                for link in links
-                if "/world/" in link and date_pattern.search(link)
-            ]
+def extract_links(html):
+    """All dated article links on a sitemap page, and the /world/ ones among them."""
 
-            if filtered_links:
-                with open("urls.txt", "a", encoding="utf-8") as f:
-                    for link in filtered_links:
-                        f.write(link + "\n")
+    soup = BeautifulSoup(html, "html.parser")
+    links = [
+        "https://www.reuters.com" + a["href"] if a["href"].startswith("/") else a["href"]
+        for a in soup.find_all("a", href=True)
+        if date_pattern.search(a["href"])
+    ]
+    return links, [link for link in links if "/world/" in link]
 
-                print(f"Found {len(filtered_links)} world news links on {sitemap_url}")
-
-        except Exception as e:
-            print(f"Error fetching {sitemap_url}: {e}")
-
-print("Completed! All links saved to urls.txt")
-
-# --- Remove duplicate URLs from file ---
-URLS_FILE = "urls.txt"
-if os.path.exists(URLS_FILE):
-    with open(URLS_FILE, "r", encoding="utf-8") as f:
-        unique_urls = sorted(set(line.strip() for line in f if line.strip()))
-
-    with open(URLS_FILE, "w", encoding="utf-8") as f:
-        f.write("\n".join(unique_urls))
-
-    print(f"Removed duplicates — {len(unique_urls)} unique URLs remain in {URLS_FILE}")
 
+async def fetch_page(client, semaphore, sitemap_url):
+    """Fetch a sitemap page, retrying transient failures with backoff; None if it never succeeds."""
 
+    payload = {"api_key": API_KEY, "url": sitemap_url}
+    for attempt in range(MAX_ATTEMPTS):
+        if attempt:
+            await asyncio.sleep(2 ** (attempt - 1))
+        try:
+            async with semaphore:
+                print(f"Fetching: {sitemap_url}")
+                resp = await client.get("https://api.scraperapi.com/", params=payload)
+        except httpx.HTTPError as e:
+            print(f"Error fetching {sitemap_url} (attempt {attempt + 1}/{MAX_ATTEMPTS}): {e}")
+            continue
+        if resp.status_code == 200:
+            return resp
+        print(f"Status {resp.status_code} for {sitemap_url} (attempt {attempt + 1}/{MAX_ATTEMPTS})")
+        if resp.status_code not in RETRY_STATUSES:
+            return None
+    return None
+
+
+def append_urls(path, links):
+    with open(path, "a", encoding="utf-8") as f:
+        for link in links:
+            f.write(link + "\n")
+
+
+async def crawl_day(client, semaphore, day, found, output):
+    # Pages of one day are walked in order; the first page without links ends
+    # the day. A page that fails after retries is skipped, not the rest of the day
+    day_links = []
+    for page in range(1, MAX_PAGES + 1):
+        sitemap_url = f"https://www.reuters.com/sitemap/{day.year}-{day.month:02d}/{day.day:02d}/{page}/"
+        resp = await fetch_page(client, semaphore, sitemap_url)
+        if resp is None:
+            print(f"Skipping {sitemap_url}")
+            continue
+
+        links, world_links = await asyncio.to_thread(extract_links, resp.text)
+        if not links:
+            break
+
+        new_links = [link for link in world_links if link not in found]
+        found.update(new_links)
+        day_links.extend(new_links)
+        print(f"Found {len(new_links)} new world news links on {sitemap_url}")
+
+    # Saved per day, so a crash keeps every finished day
+    append_urls(output, day_links)
+
+
+async def main():
+    args = parse_args()
+    if args.end < args.start:
+        raise SystemExit("--end must not be before --start")
+
+    days = [args.start + timedelta(days=i) for i in range((args.end - args.start).days + 1)]
+    found = set()  # deduplicated as links come in
+
+    # --- Output file (overwrite); each finished day is appended to it ---
+    with open(args.output, "w", encoding="utf-8"):
+        pass
+
+    # Days are crawled in parallel, bounded by the shared request semaphore
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    async with httpx.AsyncClient(timeout=30) as client:
+        await asyncio.gather(*(crawl_day(client, semaphore, day, found, args.output) for day in days))
+
+    # --- Rewrite the complete crawl sorted ---
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write("\n".join(sorted(found)))
+
+    print(f"Completed! {len(found)} unique URLs from {args.start} to {args.end} saved to {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+
+# ===============================================================================
+# Content-addressed raw-HTML archive
+#
+# Every fetched page is stored once, gzip-compressed, under its sha256, and
+# index.jsonl maps each URL to the object it was last fetched as. Article
+# extraction can then be re-run offline after a parser change.
+
+DEFAULT_ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "html_archive")
+
+
+class HtmlArchive:
+    def __init__(self, directory=DEFAULT_ARCHIVE_DIR):
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.jsonl")
+        self.entries = {}  # url -> {"url", "sha256", "fetched_at", "size"}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn last line from a crash
+                    self.entries[entry["url"]] = entry
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, url):
+        return url in self.entries
+
+    def object_path(self, digest):
+        return os.path.join(self.directory, "objects", digest[:2], f"{digest}.html.gz")
+
+    def put(self, url, html):
+        """Store a page (safe from several threads); identical pages share one object."""
+
+        data = html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        entry = {"url": url, "sha256": digest, "fetched_at": time.time(), "size": len(data)}
+        with self._lock:
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self.entries[url] = entry
+        return digest
+
+    def path_for(self, url):
+        entry = self.entries.get(url)
+        return self.object_path(entry["sha256"]) if entry else None
+
+    def get(self, url):
+        path = self.path_for(url)
+        return read_object(path) if path else None
+
+    def stats(self):
+        objects = {entry["sha256"]: entry["size"] for entry in self.entries.values()}
+        stored = sum(os.path.getsize(self.object_path(d)) for d in objects if os.path.exists(self.object_path(d)))
+        return {"urls": len(self.entries), "objects": len(objects), "raw_bytes": sum(objects.values()), "stored_bytes": stored}
+
+
+def read_object(path):
+    with gzip.open(path, "rb") as f:
+        return f.read().decode("utf-8")
+
+
+if __name__ == "__main__":
+    print(json.dumps(HtmlArchive(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_ARCHIVE_DIR).stats(), indent=2))
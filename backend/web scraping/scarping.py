@@ -1,104 +1,126 @@
-import requests
-from bs4 import BeautifulSoup
+import asyncio
 import json
 import os
-from urllib.parse import urlparse
+import sys
 
-from urllib.parse import urlencode
-from newspaper import Article
-from newspaper import fulltext
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "embeddings"))
+from article_store import DEFAULT_ARTICLES_PATH, append_articles, ensure_store, iter_urls
+from extract import extract_article
+from html_archive import HtmlArchive
 
 API_KEY = ""  # ScraperAPI key
 URLS_FILE = "urls.txt"
-JSON_FILE = "reuters_articles.json"
-
-# --- Helper: Extract slug from URL ---
-def get_slug(url):
-    path = urlparse(url).path
-    slug = path.strip("/").split("/")[-1] or "article"
-    return slug
-
-# --- Load all URLs from file ---
-if not os.path.exists(URLS_FILE):
-    print(f"{URLS_FILE} not found!")
-    exit()
+JOURNAL_FILE = "scrape_journal.jsonl"
+MAX_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", "8"))
+MAX_ATTEMPTS = 3  # across runs; a URL that keeps failing is given up on
+REQUEST_TIMEOUT = 70  # ScraperAPI can take up to a minute on retries
+
+# --- Progress journal: one line per finished URL, so a crashed run resumes ---
+class ScrapeJournal:
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        self.failures = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn last line from a crash
+                    if entry["status"] == "ok":
+                        self.done.add(entry["url"])
+                        self.failures.pop(entry["url"], None)
+                    else:
+                        self.failures[entry["url"]] = self.failures.get(entry["url"], 0) + 1
+        self._file = open(path, "a", encoding="utf-8")
+
+    def should_skip(self, url):
+        return url in self.done or self.failures.get(url, 0) >= MAX_ATTEMPTS
+
+    def record(self, url, status, error=None):
+        entry = {"url": url, "status": status}
+        if error:
+            entry["error"] = error
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        if status == "ok":
+            self.done.add(url)
+        else:
+            self.failures[url] = self.failures.get(url, 0) + 1
+
+    def close(self):
+        self._file.close()
+
+
+# --- Archive the raw HTML and extract the article (blocking, runs in a thread) ---
+def archive_and_extract(archive, target_url, html):
+    archive.put(target_url, html)
+    return extract_article(target_url, html)
+
+
+async def scrape_one(client, semaphore, archive, journal, scraped_urls, target_url):
+    async with semaphore:
+        print(f"Fetching: {target_url}")
+        payload = {
+            'api_key': API_KEY,
+            'url': target_url
+        }
+        try:
+            response = await client.get('https://api.scraperapi.com', params=payload)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            print(f"Error fetching {target_url}: {e}")
+            journal.record(target_url, "failed", str(e))
+            return
 
-with open(URLS_FILE, "r", encoding="utf-8") as f:
-    urls = [line.strip() for line in f if line.strip()]
+    try:
+        article_data = await asyncio.to_thread(archive_and_extract, archive, target_url, response.text)
+    except Exception as e:
+        print(f"Error parsing {target_url}: {e}")
+        journal.record(target_url, "failed", str(e))
+        return
+
+    # Only the event loop writes, so appends never interleave
+    append_articles([article_data])
+    scraped_urls.add(target_url)
+    journal.record(target_url, "ok")
+    print(f"Article scraped: {article_data['title']}")
+
+
+async def main():
+    # --- Load all URLs from file ---
+    if not os.path.exists(URLS_FILE):
+        print(f"{URLS_FILE} not found!")
+        return
+
+    with open(URLS_FILE, "r", encoding="utf-8") as f:
+        urls = list(dict.fromkeys(line.strip() for line in f if line.strip()))
+
+    print(f"Loaded {len(urls)} URLs from {URLS_FILE}")
+
+    # --- Skip URLs already in the article store or finished in an earlier run ---
+    ensure_store()
+    scraped_urls = set(iter_urls())
+    journal = ScrapeJournal(JOURNAL_FILE)
+    pending = [url for url in urls if url not in scraped_urls and not journal.should_skip(url)]
+    print(f"{len(urls) - len(pending)} already done, {len(pending)} to scrape")
+
+    archive = HtmlArchive()
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    limits = httpx.Limits(max_connections=MAX_CONCURRENCY)
+    try:
+        async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT, limits=limits) as client:
+            await asyncio.gather(*(
+                scrape_one(client, semaphore, archive, journal, scraped_urls, url) for url in pending
+            ))
+    finally:
+        journal.close()
 
-print(f"Loaded {len(urls)} URLs from {URLS_FILE}")
+    print(f"All articles saved to {DEFAULT_ARTICLES_PATH}")
 
-# --- Load existing JSON if available ---
-if os.path.exists(JSON_FILE):
-    with open(JSON_FILE, "r", encoding="utf-8") as f:
-        try:
-            all_articles = json.load(f)
-        except json.JSONDecodeError:
-            all_articles = []
-else:
-    all_articles = []
-
-os.makedirs("reuters_articles_html", exist_ok=True)
-# --- Process each URL ---
-for target_url in urls:
-    slug = get_slug(target_url)
-    html_filename = os.path.join("reuters_articles_html", f"{slug}.html")
-
-    # Skip if already scraped
-    if any(article.get("url") == target_url for article in all_articles):
-        print(f"Skipping already scraped: {target_url}")
-        continue
-
-    print(f"Fetching: {target_url}")
-    payload = {
-        'api_key': API_KEY,
-        'url': target_url
-    }
-
-    article = Article(target_url)
 
-    try:
-        response = requests.get('https://api.scraperapi.com', params=urlencode(payload))
-        response.raise_for_status()
-    except requests.RequestException as e:
-        print(f"Error fetching {target_url}: {e}")
-        continue
-
-    html = response.text
-
-    # Save raw HTML
-    with open(html_filename, "w", encoding="utf-8") as f:
-        f.write(html)
-    print(f"HTML saved: {html_filename}")
-
-    ## Insert HTML into the Newspaper3k article object and parse the article
-    input_html = response.text
-    article.download(input_html)
-    article.parse()
-
-    text = fulltext(response.text)
-
-    title = article.title
-    # Convert datetime to string if not None
-    publication_date = (
-        article.publish_date.isoformat() if article.publish_date else None
-    )
-
-    full_text = " ".join(text.split())
-
-    # Structured data
-    article_data = {
-        "title": title,
-        "publication_date": publication_date,
-        "url": target_url,
-        "full_text": full_text
-    }
-
-    all_articles.append(article_data)
-    print(f"Article scraped: {title}")
-
-    with open(JSON_FILE, "w", encoding="utf-8") as f:
-        json.dump(all_articles, f, indent=2, ensure_ascii=False)
-
-# --- Save all structured data ---
-print(f"All articles saved to {JSON_FILE}")
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(main())
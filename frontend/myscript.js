@@ -118,6 +118,8 @@ function logout() {
 // Global variables
 let ws = null;
 let fullMessage = "";
+let answerInProgress = false;
+let skipUntilTurnEnd = false;  // frames still arriving for an answer that was replaced
 let currentAssistantMessage = null;
 let currentThreadId = Date.now().toString();
 
@@ -150,8 +152,23 @@ function createWebSocket(threadId) {
             console.log(`WebSocket connected to thread: ${threadId}`);
         };
         
+        // Frames: {type: "delta", text} | {type: "sources", sources} | {type: "done", cancelled?} | {type: "error", message}
+        // Every answer ends with exactly one "done" or "error" frame
         ws.onmessage = function(event) {
-            fullMessage += event.data;
+            const frame = JSON.parse(event.data);
+            const turnEnded = frame.type === 'done' || frame.type === 'error';
+            if (skipUntilTurnEnd) {
+                if (turnEnded) skipUntilTurnEnd = false;
+                return;
+            }
+            if (turnEnded) answerInProgress = false;
+            if (frame.type === 'delta') {
+                fullMessage += frame.text;
+            } else if (frame.type === 'error') {
+                fullMessage += `Error: ${frame.message}`;
+            } else {
+                return;
+            }
             if (currentAssistantMessage) {
                 const content = currentAssistantMessage.querySelector('.content p');
                 content.innerHTML = makeLinksClickable(fullMessage);
@@ -160,6 +177,8 @@ function createWebSocket(threadId) {
         };
         
         ws.onclose = function(event) {
+            answerInProgress = false;
+            skipUntilTurnEnd = false;
             console.log(`WebSocket closed: ${event.code} - ${event.reason}`);
             ws = null;
         };
@@ -193,8 +212,11 @@ function sendMessage() {
     addAssistantMessage();
     updateChatTitle(message);
     
+    // Sending while an answer is streaming cancels it on the server
+    if (answerInProgress) skipUntilTurnEnd = true;
+    answerInProgress = true;
     fullMessage = "";
-    ws.send(message);
+    ws.send(JSON.stringify({type: 'message', text: message}));
     
     message_box.value = '';
     message_box.style.height = "auto";
@@ -460,6 +482,9 @@ function setupEventListeners() {
         if (e.key === 'Enter' && !e.shiftKey) {
             e.preventDefault();
             sendMessage();
+        } else if (e.key === 'Escape' && answerInProgress && ws && ws.readyState === WebSocket.OPEN) {
+            // Stop the answer that is being generated
+            ws.send(JSON.stringify({type: 'cancel'}));
         }
     });
 